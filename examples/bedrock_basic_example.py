@@ -61,7 +61,9 @@ async def basic_bedrock_example():
             claude_haiku_model_id="anthropic.claude-3-haiku-20240307-v1:0",
             titan_embedding_model_id="amazon.titan-embed-text-v2:0",
             max_tokens=4096,
-            temperature=0.7
+            temperature=0.7,
+            semantic_cache_enabled=True,  # Serve repeated/similar queries from cache
+            embedding_cache_enabled=True  # Skip re-embedding unchanged text on re-runs
         )
         
         print(f"📍 Using AWS Region: {bedrock_config.aws_region}")
@@ -150,15 +152,20 @@ async def basic_bedrock_example():
             "What applications does AI have in different industries?"
         ]
         
-        for i, query in enumerate(queries, 1):
+        # Queries are independent, so run them concurrently (bounded to stay
+        # under Bedrock throttling limits) and print the answers in order
+        semaphore = asyncio.Semaphore(4)
+        
+        async def run_query(query: str) -> str:
+            async with semaphore:
+                # Use hybrid mode for comprehensive results
+                return await rag.aquery(query, mode="hybrid")
+        
+        results = await asyncio.gather(*(run_query(q) for q in queries))
+        
+        for i, (query, result) in enumerate(zip(queries, results), 1):
             print(f"\n📋 Query {i}: {query}")
-            
-            # Use hybrid mode for comprehensive results
-            result = await rag.aquery(query, mode="hybrid")
             print(f"💬 Answer: {result[:200]}...")
-            
-            # Add a small delay between queries
-            await asyncio.sleep(1)
         
         # Step 7: Test different models
         print("\n🚀 Testing different Claude models...")
@@ -171,16 +178,13 @@ async def basic_bedrock_example():
         )
         print(f"💬 Sonnet: {sonnet_result[:150]}...")
         
-        # Test with Claude Haiku (faster)
-        print("\n⚡ Using Claude 3 Haiku:")
-        # Note: In a real implementation, you'd modify the LLM function to use Haiku
-        # For this example, we'll simulate it
-        haiku_result = await rag.aquery(
+        # Adaptive: Haiku drafts and grades the answer, Sonnet only if needed
+        print("\n⚡ Using Claude 3 Haiku with Sonnet fallback:")
+        haiku_result = await rag.aquery_adaptive(
             "What is AWS Bedrock in one sentence?",
-            mode="naive",  # Use simpler mode for faster response
-            use_haiku=True  # This would be handled in the actual implementation
+            mode="naive"  # Use simpler mode for faster response
         )
-        print(f"💬 Haiku: {haiku_result[:150]}...")
+        print(f"💬 Adaptive: {haiku_result[:150]}...")
         
         # Step 8: Show configuration info
         print("\n📊 Bedrock Configuration Info:")
@@ -207,11 +211,11 @@ async def cleanup_example():
     """Clean up example data"""
     print("\n🧹 Cleaning up example data...")
     
-    import shutil
+    from raganything.utils import fast_rmtree
     storage_dir = Path("./bedrock_rag_storage")
     
     if storage_dir.exists():
-        shutil.rmtree(storage_dir)
+        fast_rmtree(storage_dir)
         print("✅ Cleaned up storage directory")
 
 
@@ -11,18 +11,223 @@ This demo shows how to:
 
 import asyncio
 import os
+import random
 import sys
 import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from functools import lru_cache
+from itertools import repeat
 from pathlib import Path
 from typing import List, Dict, Any
 import json
 
+import numpy as np
+
 # Add project root to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from raganything.bedrock_rag import BedrockRAGAnything
 from raganything import RAGAnythingConfig
 from raganything.bedrock import BedrockConfig
+from raganything.bedrock.cache import BedrockTokenBucket
+from raganything.bedrock.exceptions import BedrockRateLimitError
+
+
+DOCUMENT_TEMPLATES = [
+    {
+        "title": "Artificial Intelligence Overview",
+        "content": """
+        Artificial Intelligence (AI) represents one of the most significant technological 
+        advances of our time. AI systems can perform tasks that typically require human 
+        intelligence, such as visual perception, speech recognition, decision-making, 
+        and language translation.
+        
+        Key AI Technologies:
+        - Machine Learning: Algorithms that improve through experience
+        - Deep Learning: Neural networks with multiple layers
+        - Natural Language Processing: Understanding and generating human language
+        - Computer Vision: Interpreting and understanding visual information
+        
+        Applications span across healthcare, finance, transportation, and entertainment.
+        """
+    },
+    {
+        "title": "Machine Learning Fundamentals",
+        "content": """
+        Machine Learning (ML) is a subset of artificial intelligence that focuses on 
+        algorithms that can learn and make decisions from data without being explicitly 
+        programmed for every scenario.
+        
+        Types of Machine Learning:
+        1. Supervised Learning: Learning with labeled examples
+        2. Unsupervised Learning: Finding patterns in unlabeled data
+        3. Reinforcement Learning: Learning through interaction and feedback
+        
+        Common algorithms include linear regression, decision trees, neural networks,
+        and support vector machines. The choice depends on the problem type and data characteristics.
+        """
+    },
+    {
+        "title": "Cloud Computing and AWS",
+        "content": """
+        Cloud computing has revolutionized how organizations deploy and manage IT infrastructure.
+        Amazon Web Services (AWS) is a leading cloud platform offering over 200 services.
+        
+        Core AWS Services:
+        - EC2: Elastic Compute Cloud for virtual servers
+        - S3: Simple Storage Service for object storage
+        - RDS: Relational Database Service
+        - Lambda: Serverless computing platform
+        - Bedrock: Managed foundation models service
+        
+        Benefits include scalability, cost-effectiveness, and global availability.
+        """
+    },
+    {
+        "title": "Data Science and Analytics",
+        "content": """
+        Data Science combines statistics, programming, and domain expertise to extract
+        insights from data. It involves collecting, cleaning, analyzing, and interpreting
+        large datasets to inform business decisions.
+        
+        Data Science Process:
+        1. Problem Definition
+        2. Data Collection and Cleaning
+        3. Exploratory Data Analysis
+        4. Model Building and Validation
+        5. Deployment and Monitoring
+        
+        Tools include Python, R, SQL, Jupyter notebooks, and various visualization libraries.
+        """
+    },
+    {
+        "title": "Cybersecurity Essentials",
+        "content": """
+        Cybersecurity protects digital systems, networks, and data from digital attacks.
+        As organizations become more digital, cybersecurity becomes increasingly critical.
+        
+        Key Security Principles:
+        - Confidentiality: Protecting information from unauthorized access
+        - Integrity: Ensuring data accuracy and completeness
+        - Availability: Ensuring systems are accessible when needed
+        
+        Common threats include malware, phishing, ransomware, and social engineering.
+        Defense strategies involve firewalls, encryption, access controls, and security awareness training.
+        """
+    }
+]
+
+
+@lru_cache(maxsize=None)
+def _prepare_template(template_index: int, generated_at: str):
+    """Build a template's file name stem and header once per process"""
+    template = DOCUMENT_TEMPLATES[template_index]
+    stem = template['title'].lower().replace(' ', '_')
+    body = f"Title: {template['title']}\nGenerated: {generated_at}\n\n{template['content']}"
+    return stem, body
+
+
+def _write_sample_document(index: int, sample_dir: Path, generated_at: str) -> Path:
+    """Write one sample document; module-level so process pools can pickle it"""
+    stem, body = _prepare_template(index % len(DOCUMENT_TEMPLATES), generated_at)
+    filepath = sample_dir / f"document_{index+1:03d}_{stem}.txt"
+    content = "".join((
+        f"Document #{index+1}\n",
+        body,
+        f"\n\nDocument ID: DOC-{index+1:03d}",
+        "\nProcessing Batch: BATCH-001",
+    ))
+    filepath.write_bytes(content.encode('utf-8'))
+    return filepath
+
+
+@dataclass
+class ProcessingStats:
+    """Per-document processing metrics stored column-wise in NumPy arrays"""
+    
+    times: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.float32))  # seconds
+    ok: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.bool_))
+    total_processing_time: float = 0.0
+    
+    def resize(self, n: int):
+        """Size the per-document arrays for n documents"""
+        self.times = np.resize(self.times, n)
+        self.ok = np.resize(self.ok, n)
+        self.times[:] = 0.0
+        self.ok[:] = False
+    
+    def record(self, index: int, elapsed: float, succeeded: bool):
+        """Record the outcome of one document"""
+        self.times[index] = elapsed
+        self.ok[index] = succeeded
+    
+    @property
+    def total_documents(self) -> int:
+        return len(self.ok)
+    
+    @property
+    def processed_documents(self) -> int:
+        return int(self.ok.sum())
+    
+    @property
+    def failed_documents(self) -> int:
+        return self.total_documents - self.processed_documents
+    
+    @property
+    def average_processing_time(self) -> float:
+        return self.total_processing_time / self.total_documents if self.total_documents else 0.0
+    
+    @property
+    def documents_per_minute(self) -> float:
+        if self.total_processing_time <= 0:
+            return 0.0
+        return self.processed_documents / self.total_processing_time * 60
+    
+    @property
+    def mean_document_latency(self) -> float:
+        return float(self.times[self.ok].mean()) if self.processed_documents else 0.0
+
+
+class QueryMetrics:
+    """Per-query metrics stored column-wise in preallocated NumPy arrays"""
+    
+    MODES = ("local", "global", "hybrid", "naive", "mix", "bypass")
+    
+    def __init__(self, capacity: int = 1024):
+        self.count = 0
+        self.times = np.empty(capacity, dtype=np.float32)  # seconds
+        self.lengths = np.empty(capacity, dtype=np.int32)
+        self.mode_ids = np.empty(capacity, dtype=np.int8)
+        self.succeeded = np.empty(capacity, dtype=np.bool_)
+    
+    def _grow(self):
+        capacity = len(self.times) * 2
+        for name in ("times", "lengths", "mode_ids", "succeeded"):
+            column = getattr(self, name)
+            grown = np.empty(capacity, dtype=column.dtype)
+            grown[:self.count] = column[:self.count]
+            setattr(self, name, grown)
+    
+    def record(self, mode: str, elapsed_ns: int, result_length: int = 0, succeeded: bool = True):
+        """Record one query"""
+        if self.count == len(self.times):
+            self._grow()
+        i = self.count
+        self.times[i] = elapsed_ns / 1e9
+        self.lengths[i] = result_length
+        self.mode_ids[i] = self.MODES.index(mode)
+        self.succeeded[i] = succeeded
+        self.count += 1
+    
+    def successful(self):
+        """Return (times, lengths, mode_ids) of the successful queries"""
+        mask = self.succeeded[:self.count]
+        return (
+            self.times[:self.count][mask],
+            self.lengths[:self.count][mask],
+            self.mode_ids[:self.count][mask],
+        )
 
 
 class BatchProcessingDemo:
@@ -30,14 +235,7 @@ class BatchProcessingDemo:
     
     def __init__(self):
         self.rag = None
-        self.processing_stats = {
-            'total_documents': 0,
-            'processed_documents': 0,
-            'failed_documents': 0,
-            'total_processing_time': 0,
-            'average_processing_time': 0,
-            'documents_per_minute': 0
-        }
+        self.processing_stats = ProcessingStats()
         
     async def setup_rag(self):
         """Set up RAG Anything with optimized batch processing configuration"""
@@ -64,7 +262,8 @@ class BatchProcessingDemo:
             titan_embedding_model_id="amazon.titan-embed-text-v2:0",
             max_tokens=2048,  # Smaller token limit for faster processing
             temperature=0.3,  # Lower temperature for consistent results
-            retry_config=None  # Will use defaults
+            semantic_cache_enabled=True,  # Serve repeated similar queries in the same mode from cache
+            embedding_cache_enabled=True  # Skip re-embedding unchanged text on re-runs
         )
         
         self.rag = BedrockRAGAnything(
@@ -85,148 +284,112 @@ class BatchProcessingDemo:
         print(f"📄 Creating {num_docs} sample documents...")
         
         sample_dir = Path("./sample_documents")
-        sample_dir.mkdir(exist_ok=True)
+        sample_dir.mkdir(parents=True, exist_ok=True)
         
-        document_templates = [
-            {
-                "title": "Artificial Intelligence Overview",
-                "content": """
-                Artificial Intelligence (AI) represents one of the most significant technological 
-                advances of our time. AI systems can perform tasks that typically require human 
-                intelligence, such as visual perception, speech recognition, decision-making, 
-                and language translation.
-                
-                Key AI Technologies:
-                - Machine Learning: Algorithms that improve through experience
-                - Deep Learning: Neural networks with multiple layers
-                - Natural Language Processing: Understanding and generating human language
-                - Computer Vision: Interpreting and understanding visual information
-                
-                Applications span across healthcare, finance, transportation, and entertainment.
-                """
-            },
-            {
-                "title": "Machine Learning Fundamentals",
-                "content": """
-                Machine Learning (ML) is a subset of artificial intelligence that focuses on 
-                algorithms that can learn and make decisions from data without being explicitly 
-                programmed for every scenario.
-                
-                Types of Machine Learning:
-                1. Supervised Learning: Learning with labeled examples
-                2. Unsupervised Learning: Finding patterns in unlabeled data
-                3. Reinforcement Learning: Learning through interaction and feedback
-                
-                Common algorithms include linear regression, decision trees, neural networks,
-                and support vector machines. The choice depends on the problem type and data characteristics.
-                """
-            },
-            {
-                "title": "Cloud Computing and AWS",
-                "content": """
-                Cloud computing has revolutionized how organizations deploy and manage IT infrastructure.
-                Amazon Web Services (AWS) is a leading cloud platform offering over 200 services.
-                
-                Core AWS Services:
-                - EC2: Elastic Compute Cloud for virtual servers
-                - S3: Simple Storage Service for object storage
-                - RDS: Relational Database Service
-                - Lambda: Serverless computing platform
-                - Bedrock: Managed foundation models service
-                
-                Benefits include scalability, cost-effectiveness, and global availability.
-                """
-            },
-            {
-                "title": "Data Science and Analytics",
-                "content": """
-                Data Science combines statistics, programming, and domain expertise to extract
-                insights from data. It involves collecting, cleaning, analyzing, and interpreting
-                large datasets to inform business decisions.
-                
-                Data Science Process:
-                1. Problem Definition
-                2. Data Collection and Cleaning
-                3. Exploratory Data Analysis
-                4. Model Building and Validation
-                5. Deployment and Monitoring
-                
-                Tools include Python, R, SQL, Jupyter notebooks, and various visualization libraries.
-                """
-            },
-            {
-                "title": "Cybersecurity Essentials",
-                "content": """
-                Cybersecurity protects digital systems, networks, and data from digital attacks.
-                As organizations become more digital, cybersecurity becomes increasingly critical.
-                
-                Key Security Principles:
-                - Confidentiality: Protecting information from unauthorized access
-                - Integrity: Ensuring data accuracy and completeness
-                - Availability: Ensuring systems are accessible when needed
-                
-                Common threats include malware, phishing, ransomware, and social engineering.
-                Defense strategies involve firewalls, encryption, access controls, and security awareness training.
-                """
-            }
-        ]
+        generated_at = time.strftime('%Y-%m-%d %H:%M:%S')
         
-        created_files = []
-        
-        for i in range(num_docs):
-            template = document_templates[i % len(document_templates)]
-            filename = f"document_{i+1:03d}_{template['title'].lower().replace(' ', '_')}.txt"
-            filepath = sample_dir / filename
-            
-            # Add document-specific content
-            content = f"Document #{i+1}\n"
-            content += f"Title: {template['title']}\n"
-            content += f"Generated: {time.strftime('%Y-%m-%d %H:%M:%S')}\n\n"
-            content += template['content']
-            content += f"\n\nDocument ID: DOC-{i+1:03d}"
-            content += f"\nProcessing Batch: BATCH-001"
-            
-            with open(filepath, 'w', encoding='utf-8') as f:
-                f.write(content)
-            
-            created_files.append(filepath)
+        # Documents are independent, so write them from a pool of processes
+        with ProcessPoolExecutor() as executor:
+            created_files = list(executor.map(
+                _write_sample_document,
+                range(num_docs),
+                repeat(sample_dir, num_docs),
+                repeat(generated_at, num_docs),
+                chunksize=32
+            ))
         
         print(f"✅ Created {len(created_files)} sample documents in {sample_dir}")
         return created_files
     
-    async def process_documents_batch(self, document_paths: List[Path]) -> Dict[str, Any]:
-        """Process documents in batch with progress monitoring"""
+    async def process_documents_batch(self, document_paths: List[Path], interactive: bool = False) -> ProcessingStats:
+        """Process documents in batch with progress monitoring
+
+        Unless ``interactive`` is set, chunk embeddings are computed first with
+        Bedrock Batch Inference (when configured). Documents are dispatched through a token bucket sized to the Bedrock
+        tokens-per-minute quota, and the number of concurrent workers shrinks
+        when Bedrock throttles and grows back while requests succeed.
+        """
         print(f"\n🚀 Starting batch processing of {len(document_paths)} documents...")
         
         start_time = time.time()
-        self.processing_stats['total_documents'] = len(document_paths)
+        self.processing_stats.resize(len(document_paths))
         
-        # Process documents using the batch processing capability
-        try:
-            await self.rag.process_folder_complete(
-                folder_path=str(document_paths[0].parent),
-                output_dir="./batch_output",
-                file_extensions=[".txt", ".pdf", ".docx"],
-                recursive=False,
-                max_workers=4  # Process 4 documents concurrently
+        if not interactive:
+            await self.rag.prewarm_embeddings_batch(
+                [str(path) for path in document_paths],
+                output_dir="./batch_output"
+            )
+        
+        bucket = BedrockTokenBucket(tokens_per_minute=200000, requests_per_minute=60)
+        max_workers = 4
+        concurrency = {'limit': max_workers, 'active': 0}
+        slot_available = asyncio.Condition()
+        
+        async def acquire_slot():
+            async with slot_available:
+                await slot_available.wait_for(lambda: concurrency['active'] < concurrency['limit'])
+                concurrency['active'] += 1
+        
+        async def release_slot(throttled: bool):
+            async with slot_available:
+                concurrency['active'] -= 1
+                if throttled:
+                    concurrency['limit'] = max(1, concurrency['limit'] // 2)
+                elif concurrency['limit'] < max_workers:
+                    concurrency['limit'] += 1
+                slot_available.notify_all()
+        
+        def is_throttling(error: Exception) -> bool:
+            return isinstance(error, BedrockRateLimitError) or "Throttling" in str(error)
+        
+        async def process_one(index: int, path: Path):
+            doc_start = time.perf_counter()
+            succeeded = await process_with_retries(path)
+            self.processing_stats.record(index, time.perf_counter() - doc_start, succeeded)
+        
+        async def process_with_retries(path: Path) -> bool:
+            estimated_tokens = BedrockTokenBucket.estimate_tokens(
+                path.read_text(encoding="utf-8", errors="ignore")
             )
+            for attempt in range(6):
+                await bucket.acquire(estimated_tokens)
+                await acquire_slot()
+                throttled = False
+                try:
+                    await self.rag.process_document_complete(
+                        file_path=str(path),
+                        output_dir="./batch_output"
+                    )
+                    return True
+                except Exception as e:
+                    if not is_throttling(e):
+                        print(f"❌ Failed to process {path.name}: {str(e)}")
+                        return False
+                    throttled = True
+                finally:
+                    await release_slot(throttled)
+                
+                # Exponential backoff with jitter, capped at 32 seconds
+                delay = min(32.0, 2 ** attempt) * random.uniform(0.5, 1.0)
+                print(f"⏳ Throttled on {path.name}, retrying in {delay:.1f}s "
+                      f"(workers: {concurrency['limit']})")
+                await asyncio.sleep(delay)
             
-            end_time = time.time()
-            total_time = end_time - start_time
+            print(f"❌ Giving up on {path.name} after repeated throttling")
+            return False
+        
+        try:
+            await asyncio.gather(*(
+                process_one(index, path) for index, path in enumerate(document_paths)
+            ))
             
-            self.processing_stats.update({
-                'processed_documents': len(document_paths),
-                'failed_documents': 0,
-                'total_processing_time': total_time,
-                'average_processing_time': total_time / len(document_paths),
-                'documents_per_minute': (len(document_paths) / total_time) * 60
-            })
+            self.processing_stats.total_processing_time = time.time() - start_time
             
             print(f"✅ Batch processing completed successfully!")
             
         except Exception as e:
             print(f"❌ Batch processing failed: {str(e)}")
-            self.processing_stats['failed_documents'] = len(document_paths)
+            self.processing_stats.ok[:] = False
             raise
         
         return self.processing_stats
@@ -264,85 +427,81 @@ class BatchProcessingDemo:
             }
         ]
         
-        query_results = []
+        # Queries are independent, so run them concurrently; the semaphore
+        # keeps the number of in-flight Bedrock calls under the throttling limit
+        semaphore = asyncio.Semaphore(4)
+        
+        async def run_query(query_info: Dict[str, Any]):
+            async with semaphore:
+                start_time = time.perf_counter_ns()
+                try:
+                    # Stream the answer and stop once the preview is filled,
+                    # freeing the slot for the next query without waiting
+                    # for the rest of the generation. A question similar to
+                    # one answered earlier comes from the semantic cache.
+                    chunks = [
+                        chunk async for chunk in self.rag.aquery_stream(
+                            query_info['query'], mode=query_info['mode'], max_chars=200
+                        )
+                    ]
+                    result = "".join(chunks)
+                    return result, time.perf_counter_ns() - start_time, None
+                except Exception as e:
+                    return None, time.perf_counter_ns() - start_time, e
         
-        for i, query_info in enumerate(queries, 1):
+        outcomes = await asyncio.gather(*(run_query(q) for q in queries))
+        
+        query_metrics = QueryMetrics(capacity=len(queries))
+        
+        for i, (query_info, (result, elapsed_ns, error)) in enumerate(zip(queries, outcomes), 1):
             print(f"\n📋 Query {i}: {query_info['description']}")
             print(f"   Question: {query_info['query']}")
             print(f"   Mode: {query_info['mode']}")
             
-            start_time = time.time()
-            
-            try:
-                result = await self.rag.aquery(
-                    query_info['query'],
-                    mode=query_info['mode']
-                )
-                
-                query_time = time.time() - start_time
-                
-                print(f"   ⏱️  Response time: {query_time:.2f}s")
+            if error is None:
+                print(f"   ⏱️  Time to preview: {elapsed_ns / 1e9:.2f}s")
                 print(f"   💬 Answer: {result[:200]}...")
-                
-                query_results.append({
-                    'query': query_info['query'],
-                    'mode': query_info['mode'],
-                    'response_time': query_time,
-                    'result_length': len(result)
-                })
-                
-            except Exception as e:
-                print(f"   ❌ Query failed: {str(e)}")
-                query_results.append({
-                    'query': query_info['query'],
-                    'mode': query_info['mode'],
-                    'error': str(e)
-                })
-            
-            # Small delay between queries
-            await asyncio.sleep(0.5)
+                query_metrics.record(query_info['mode'], elapsed_ns, len(result))
+            else:
+                print(f"   ❌ Query failed: {str(error)}")
+                query_metrics.record(query_info['mode'], elapsed_ns, succeeded=False)
         
-        return query_results
+        return query_metrics
     
-    async def performance_analysis(self, query_results: List[Dict]):
+    async def performance_analysis(self, query_metrics: QueryMetrics):
         """Analyze performance metrics from batch processing"""
         print("\n📊 Performance Analysis")
         print("=" * 50)
         
         # Processing statistics
         print("📈 Document Processing Statistics:")
-        print(f"  Total Documents: {self.processing_stats['total_documents']}")
-        print(f"  Successfully Processed: {self.processing_stats['processed_documents']}")
-        print(f"  Failed: {self.processing_stats['failed_documents']}")
-        print(f"  Total Processing Time: {self.processing_stats['total_processing_time']:.2f}s")
-        print(f"  Average Time per Document: {self.processing_stats['average_processing_time']:.2f}s")
-        print(f"  Documents per Minute: {self.processing_stats['documents_per_minute']:.1f}")
+        stats = self.processing_stats
+        print(f"  Total Documents: {stats.total_documents}")
+        print(f"  Successfully Processed: {stats.processed_documents}")
+        print(f"  Failed: {stats.failed_documents}")
+        print(f"  Total Processing Time: {stats.total_processing_time:.2f}s")
+        print(f"  Average Time per Document: {stats.average_processing_time:.2f}s")
+        print(f"  Mean Document Latency: {stats.mean_document_latency:.2f}s")
+        print(f"  Documents per Minute: {stats.documents_per_minute:.1f}")
         
         # Query statistics
-        successful_queries = [q for q in query_results if 'error' not in q]
-        if successful_queries:
-            avg_query_time = sum(q['response_time'] for q in successful_queries) / len(successful_queries)
-            avg_result_length = sum(q['result_length'] for q in successful_queries) / len(successful_queries)
-            
+        times, lengths, mode_ids = query_metrics.successful()
+        if len(times):
             print(f"\n🔍 Query Performance Statistics:")
-            print(f"  Total Queries: {len(query_results)}")
-            print(f"  Successful Queries: {len(successful_queries)}")
-            print(f"  Average Query Time: {avg_query_time:.2f}s")
-            print(f"  Average Result Length: {avg_result_length:.0f} characters")
+            print(f"  Total Queries: {query_metrics.count}")
+            print(f"  Successful Queries: {len(times)}")
+            print(f"  Average Time to Preview: {times.mean():.2f}s")
+            print(f"  Average Preview Length: {lengths.mean():.0f} characters")
             
             # Query mode analysis
-            mode_stats = {}
-            for query in successful_queries:
-                mode = query['mode']
-                if mode not in mode_stats:
-                    mode_stats[mode] = {'count': 0, 'total_time': 0}
-                mode_stats[mode]['count'] += 1
-                mode_stats[mode]['total_time'] += query['response_time']
+            num_modes = len(QueryMetrics.MODES)
+            mode_counts = np.bincount(mode_ids, minlength=num_modes)
+            mode_times = np.bincount(mode_ids, weights=times, minlength=num_modes)
             
             print(f"\n🎯 Query Mode Performance:")
-            for mode, stats in mode_stats.items():
-                avg_time = stats['total_time'] / stats['count']
-                print(f"  {mode}: {stats['count']} queries, avg {avg_time:.2f}s")
+            for mode_id in np.flatnonzero(mode_counts):
+                avg_time = mode_times[mode_id] / mode_counts[mode_id]
+                print(f"  {QueryMetrics.MODES[mode_id]}: {mode_counts[mode_id]} queries, avg {avg_time:.2f}s")
         
         # Bedrock configuration info
         bedrock_info = self.rag.get_bedrock_info()
@@ -357,7 +516,7 @@ class BatchProcessingDemo:
         """Clean up demo data"""
         print("\n🧹 Cleaning up demo data...")
         
-        import shutil
+        from raganything.utils import fast_rmtree
         
         # Clean up directories
         cleanup_dirs = [
@@ -368,10 +527,10 @@ class BatchProcessingDemo:
         
         for dir_path in cleanup_dirs:
             if Path(dir_path).exists():
-                shutil.rmtree(dir_path)
+                fast_rmtree(dir_path)
                 print(f"  ✅ Removed {dir_path}")
     
-    async def run_demo(self, num_documents: int = 10):
+    async def run_demo(self, num_documents: int = 10, interactive: bool = False):
         """Run the complete batch processing demo"""
         print("🎬 RAG Anything with AWS Bedrock - Batch Processing Demo")
         print("=" * 65)
@@ -382,21 +541,22 @@ class BatchProcessingDemo:
                 return False
             
             # Step 2: Create sample documents
-            document_paths = self.create_sample_documents(num_documents)
+            # Keep the event loop free while the documents are written
+            document_paths = await asyncio.to_thread(self.create_sample_documents, num_documents)
             
             # Step 3: Process documents in batch
-            processing_stats = await self.process_documents_batch(document_paths)
+            processing_stats = await self.process_documents_batch(document_paths, interactive)
             
             # Step 4: Demonstrate queries
-            query_results = await self.demonstrate_batch_queries()
+            query_metrics = await self.demonstrate_batch_queries()
             
             # Step 5: Performance analysis
-            await self.performance_analysis(query_results)
+            await self.performance_analysis(query_metrics)
             
             print(f"\n🎉 Batch processing demo completed successfully!")
-            print(f"📊 Processed {processing_stats['processed_documents']} documents")
-            print(f"⏱️  Total time: {processing_stats['total_processing_time']:.2f}s")
-            print(f"🚀 Throughput: {processing_stats['documents_per_minute']:.1f} docs/min")
+            print(f"📊 Processed {processing_stats.processed_documents} documents")
+            print(f"⏱️  Total time: {processing_stats.total_processing_time:.2f}s")
+            print(f"🚀 Throughput: {processing_stats.documents_per_minute:.1f} docs/min")
             
             return True
             
@@ -414,6 +574,8 @@ async def main():
     parser = argparse.ArgumentParser(description="RAG Anything Bedrock Batch Processing Demo")
     parser.add_argument("--num-docs", type=int, default=10, help="Number of documents to process")
     parser.add_argument("--cleanup", action="store_true", help="Clean up demo data after completion")
+    parser.add_argument("--interactive", action="store_true",
+                        help="Embed on demand instead of using Bedrock Batch Inference")
     
     args = parser.parse_args()
     
@@ -424,7 +586,7 @@ async def main():
     demo = BatchProcessingDemo()
     
     try:
-        success = await demo.run_demo(args.num_docs)
+        success = await demo.run_demo(args.num_docs, args.interactive)
         
         if success:
             if args.cleanup:
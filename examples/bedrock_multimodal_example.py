@@ -13,6 +13,7 @@ import asyncio
 import os
 import sys
 import base64
+import functools
 from pathlib import Path
 from io import BytesIO
 
@@ -24,8 +25,106 @@ from raganything import RAGAnythingConfig
 from raganything.bedrock import BedrockConfig
 
 
-def create_sample_image_base64():
-    """Create a simple sample image as base64 for testing"""
+# Sample document content ingested by the example
+SAMPLE_CONTENT_LIST = [
+    {
+        "type": "text",
+        "text": """
+        Machine Learning Performance Analysis Report
+        
+        This report analyzes the performance of different machine learning approaches
+        across various metrics including accuracy, processing speed, and resource usage.
+        The data shows significant improvements in deep learning approaches compared
+        to traditional methods.
+        """,
+        "page_idx": 0
+    },
+    {
+        "type": "table",
+        "table_body": """
+        | Model Type | Accuracy | Speed (ms) | Memory (GB) | Use Case |
+        |------------|----------|------------|-------------|----------|
+        | Linear Regression | 78% | 5 | 0.1 | Simple predictions |
+        | Random Forest | 85% | 25 | 0.5 | Structured data |
+        | Neural Network | 92% | 100 | 2.0 | Complex patterns |
+        | Transformer | 96% | 200 | 8.0 | NLP tasks |
+        | CNN | 94% | 150 | 4.0 | Image processing |
+        """,
+        "table_caption": ["Machine Learning Model Performance Comparison"],
+        "table_footnote": ["Data collected from 1000 test samples"],
+        "page_idx": 1
+    },
+    {
+        "type": "equation",
+        "text": "F1 = 2 × (precision × recall) / (precision + recall)",
+        "latex": "F1 = 2 \\times \\frac{\\text{precision} \\times \\text{recall}}{\\text{precision} + \\text{recall}}",
+        "equation_caption": "F1 Score Formula for Model Evaluation",
+        "page_idx": 2
+    },
+    {
+        "type": "text",
+        "text": """
+        Computer Vision Applications
+        
+        Computer vision has revolutionized many industries by enabling machines to
+        interpret and understand visual information. Key applications include:
+        
+        - Medical imaging analysis for disease detection
+        - Autonomous vehicle navigation systems  
+        - Quality control in manufacturing
+        - Facial recognition for security systems
+        - Agricultural monitoring via satellite imagery
+        
+        The accuracy of computer vision models has improved dramatically with
+        the advent of deep learning techniques.
+        """,
+        "page_idx": 3
+    }
+]
+
+# External content for the table analysis query
+TABLE_QUERY_CONTENT = [{
+    "type": "table",
+    "table_data": """Model,Accuracy,Speed_ms,Memory_GB
+    BERT,94%,180,6.0
+    GPT-3,97%,300,12.0
+    RoBERTa,93%,160,5.5
+    DistilBERT,89%,80,2.0""",
+    "table_caption": "New NLP Model Performance Data"
+}]
+
+# External content for the formula analysis query
+EQUATION_QUERY_CONTENT = [{
+    "type": "equation",
+    "latex": "\\text{Accuracy} = \\frac{TP + TN}{TP + TN + FP + FN}",
+    "equation_caption": "Classification Accuracy Formula"
+}]
+
+# External content for the advanced query combining multiple content types
+ADVANCED_QUERY_CONTENT = [
+    {
+        "type": "table",
+        "table_data": """Metric,Linear,RF,NN,Transformer,CNN
+        Training_Time_Hours,0.1,2,8,24,12
+        Inference_Cost_USD,0.001,0.01,0.05,0.20,0.10
+        Interpretability,High,Medium,Low,Very_Low,Low
+        Scalability,High,Medium,High,Very_High,High""",
+        "table_caption": "Extended ML Model Comparison"
+    },
+    {
+        "type": "equation", 
+        "latex": "\\text{Cost-Benefit} = \\frac{\\text{Accuracy} \\times \\text{Business Value}}{\\text{Training Cost} + \\text{Inference Cost}}",
+        "equation_caption": "ML Model Cost-Benefit Analysis Formula"
+    }
+]
+
+
+@functools.lru_cache(maxsize=1)
+def create_sample_image_bytes():
+    """Create a simple sample image as PNG bytes for testing
+    
+    The chart is fixed, so it is drawn and encoded once per process.
+    """
     try:
         from PIL import Image, ImageDraw, ImageFont
         
@@ -56,18 +155,24 @@ def create_sample_image_base64():
         # Add title
         draw.text((150, 20), "AI Technologies Usage", fill='black')
         
-        # Convert to base64
+        # Encode as PNG
         buffer = BytesIO()
         img.save(buffer, format='PNG')
-        img_data = buffer.getvalue()
-        
-        return base64.b64encode(img_data).decode('utf-8')
+        return buffer.getvalue()
         
     except ImportError:
         # If PIL is not available, return None
         return None
 
 
+def create_sample_image_base64():
+    """Create a simple sample image as base64 for testing"""
+    img_data = create_sample_image_bytes()
+    if img_data is None:
+        return None
+    return base64.b64encode(img_data).decode('utf-8')
+
+
 async def multimodal_bedrock_example():
     """Multimodal example using RAG Anything with AWS Bedrock"""
     
@@ -94,7 +199,9 @@ async def multimodal_bedrock_example():
             claude_haiku_model_id="anthropic.claude-3-haiku-20240307-v1:0",
             titan_embedding_model_id="amazon.titan-embed-text-v2:0",
             max_tokens=4096,
-            temperature=0.7
+            temperature=0.7,
+            embedding_cache_enabled=True,  # Skip re-embedding unchanged tables and equations on re-runs
+            semantic_cache_enabled=True  # Answer repeated questions about the same content from cache
         )
         
         print(f"📍 Using AWS Region: {bedrock_config.aws_region}")
@@ -120,64 +227,11 @@ async def multimodal_bedrock_example():
         # Step 5: Add multimodal sample content
         print("\n📊 Adding multimodal sample content...")
         
-        multimodal_content = [
-            {
-                "type": "text",
-                "text": """
-                Machine Learning Performance Analysis Report
-                
-                This report analyzes the performance of different machine learning approaches
-                across various metrics including accuracy, processing speed, and resource usage.
-                The data shows significant improvements in deep learning approaches compared
-                to traditional methods.
-                """,
-                "page_idx": 0
-            },
-            {
-                "type": "table",
-                "table_body": """
-                | Model Type | Accuracy | Speed (ms) | Memory (GB) | Use Case |
-                |------------|----------|------------|-------------|----------|
-                | Linear Regression | 78% | 5 | 0.1 | Simple predictions |
-                | Random Forest | 85% | 25 | 0.5 | Structured data |
-                | Neural Network | 92% | 100 | 2.0 | Complex patterns |
-                | Transformer | 96% | 200 | 8.0 | NLP tasks |
-                | CNN | 94% | 150 | 4.0 | Image processing |
-                """,
-                "table_caption": ["Machine Learning Model Performance Comparison"],
-                "table_footnote": ["Data collected from 1000 test samples"],
-                "page_idx": 1
-            },
-            {
-                "type": "equation",
-                "text": "F1 = 2 × (precision × recall) / (precision + recall)",
-                "latex": "F1 = 2 \\times \\frac{\\text{precision} \\times \\text{recall}}{\\text{precision} + \\text{recall}}",
-                "equation_caption": "F1 Score Formula for Model Evaluation",
-                "page_idx": 2
-            },
-            {
-                "type": "text",
-                "text": """
-                Computer Vision Applications
-                
-                Computer vision has revolutionized many industries by enabling machines to
-                interpret and understand visual information. Key applications include:
-                
-                - Medical imaging analysis for disease detection
-                - Autonomous vehicle navigation systems  
-                - Quality control in manufacturing
-                - Facial recognition for security systems
-                - Agricultural monitoring via satellite imagery
-                
-                The accuracy of computer vision models has improved dramatically with
-                the advent of deep learning techniques.
-                """,
-                "page_idx": 3
-            }
-        ]
+        # Render the sample chart in a worker thread while the content is ingested
+        sample_image_task = asyncio.create_task(asyncio.to_thread(create_sample_image_bytes))
         
         await rag.insert_content_list(
-            content_list=multimodal_content,
+            content_list=SAMPLE_CONTENT_LIST,
             file_path="ml_performance_report.pdf",
             doc_id="ml-report-multimodal-001"
         )
@@ -188,100 +242,101 @@ async def multimodal_bedrock_example():
         print("\n🔍 Testing multimodal queries with external content...")
         
         # Query 1: Table analysis
-        print("\n📊 Query 1: Analyzing external table data")
-        table_query_result = await rag.aquery_with_multimodal(
+        queries = [(
+            "\n📊 Query 1: Analyzing external table data",
+            "💬 Analysis",
+            300,
+            rag.aquery_with_multimodal,
             "Compare this new performance data with the models in the document. Which approach shows the best balance of accuracy and speed?",
-            multimodal_content=[{
-                "type": "table",
-                "table_data": """Model,Accuracy,Speed_ms,Memory_GB
-                BERT,94%,180,6.0
-                GPT-3,97%,300,12.0
-                RoBERTa,93%,160,5.5
-                DistilBERT,89%,80,2.0""",
-                "table_caption": "New NLP Model Performance Data"
-            }],
-            mode="hybrid"
-        )
-        print(f"💬 Analysis: {table_query_result[:300]}...")
+            {
+                "multimodal_content": TABLE_QUERY_CONTENT,
+                "mode": "hybrid"
+            }
+        )]
         
         # Query 2: Equation explanation
-        print("\n🧮 Query 2: Mathematical formula analysis")
-        equation_query_result = await rag.aquery_with_multimodal(
+        queries.append((
+            "\n🧮 Query 2: Mathematical formula analysis",
+            "💬 Explanation",
+            300,
+            rag.aquery_with_multimodal,
             "Explain this formula and how it relates to the F1 score mentioned in the document",
-            multimodal_content=[{
-                "type": "equation",
-                "latex": "\\text{Accuracy} = \\frac{TP + TN}{TP + TN + FP + FN}",
-                "equation_caption": "Classification Accuracy Formula"
-            }],
-            mode="hybrid"
-        )
-        print(f"💬 Explanation: {equation_query_result[:300]}...")
+            {
+                "multimodal_content": EQUATION_QUERY_CONTENT,
+                "mode": "hybrid"
+            }
+        ))
         
         # Query 3: Image analysis (if PIL is available)
-        sample_image_b64 = create_sample_image_base64()
-        if sample_image_b64:
-            print("\n🖼️  Query 3: Image analysis with vision model")
-            
-            # Create a temporary image file for testing
-            temp_image_path = Path("temp_chart.png")
-            with open(temp_image_path, "wb") as f:
-                f.write(base64.b64decode(sample_image_b64))
-            
-            try:
-                image_query_result = await rag.aquery_with_multimodal(
-                    "Analyze this chart and compare it with the performance data in the document. What insights can you provide?",
-                    multimodal_content=[{
+        sample_image = await sample_image_task
+        if sample_image:
+            # Pass the image bytes directly, no temporary file needed
+            queries.append((
+                "\n🖼️  Query 3: Image analysis with vision model",
+                "💬 Image Analysis",
+                300,
+                rag.aquery_with_multimodal,
+                "Analyze this chart and compare it with the performance data in the document. What insights can you provide?",
+                {
+                    "multimodal_content": [{
                         "type": "image",
-                        "img_path": str(temp_image_path),
+                        "img_bytes": sample_image,
                         "image_caption": ["AI Technologies Usage Chart"],
                         "image_footnote": ["Sample data visualization"]
                     }],
-                    mode="hybrid"
-                )
-                print(f"💬 Image Analysis: {image_query_result[:300]}...")
-                
-            finally:
-                # Clean up temporary image
-                if temp_image_path.exists():
-                    temp_image_path.unlink()
+                    "mode": "hybrid"
+                }
+            ))
         else:
             print("\n🖼️  Skipping image analysis (PIL not available)")
         
-        # Step 7: Test VLM enhanced queries
-        print("\n👁️  Testing VLM enhanced queries...")
-        
+        # Step 7: VLM enhanced query
         # This would automatically use vision capabilities when images are in the retrieved context
-        vlm_result = await rag.aquery(
+        queries.append((
+            "\n👁️  VLM enhanced query",
+            "💬 VLM Enhanced",
+            300,
+            rag.aquery,
             "What visual information is available in the documents and how does it support the textual content?",
-            mode="hybrid",
-            vlm_enhanced=True  # Force VLM enhancement
-        )
-        print(f"💬 VLM Enhanced: {vlm_result[:300]}...")
+            {"mode": "hybrid", "vlm_enhanced": True}  # Force VLM enhancement
+        ))
         
         # Step 8: Advanced multimodal query combining multiple content types
-        print("\n🎯 Advanced multimodal query with multiple content types...")
-        
-        advanced_result = await rag.aquery_with_multimodal(
+        queries.append((
+            "\n🎯 Advanced multimodal query with multiple content types",
+            "💬 Advanced Analysis",
+            400,
+            rag.aquery_with_multimodal,
             "Based on this new research data, provide recommendations for choosing the best ML approach considering the trade-offs shown in both the document and this new information",
-            multimodal_content=[
-                {
-                    "type": "table",
-                    "table_data": """Metric,Linear,RF,NN,Transformer,CNN
-                    Training_Time_Hours,0.1,2,8,24,12
-                    Inference_Cost_USD,0.001,0.01,0.05,0.20,0.10
-                    Interpretability,High,Medium,Low,Very_Low,Low
-                    Scalability,High,Medium,High,Very_High,High""",
-                    "table_caption": "Extended ML Model Comparison"
-                },
-                {
-                    "type": "equation", 
-                    "latex": "\\text{Cost-Benefit} = \\frac{\\text{Accuracy} \\times \\text{Business Value}}{\\text{Training Cost} + \\text{Inference Cost}}",
-                    "equation_caption": "ML Model Cost-Benefit Analysis Formula"
-                }
-            ],
-            mode="hybrid"
+            {
+                "multimodal_content": ADVANCED_QUERY_CONTENT,
+                "mode": "hybrid"
+            }
+        ))
+        
+        # Embed all query texts in one batch up front; each query reuses its
+        # embedding for the semantic cache lookup and retrieval
+        query_embeddings = await rag.aembed_batch([query for _, _, _, _, query, _ in queries])
+        for (_, _, _, _, _, kwargs), embedding in zip(queries, query_embeddings):
+            kwargs["precomputed_embedding"] = embedding
+        
+        # Queries are independent, so run them concurrently (bounded to stay
+        # under Bedrock throttling limits) and print the answers in order
+        semaphore = asyncio.Semaphore(4)
+        
+        async def run_query(query_func, query: str, kwargs: dict) -> str:
+            async with semaphore:
+                return await query_func(query, **kwargs)
+        
+        results = await asyncio.gather(
+            *(run_query(func, query, kwargs) for _, _, _, func, query, kwargs in queries)
         )
-        print(f"💬 Advanced Analysis: {advanced_result[:400]}...")
+        
+        # Write the whole report at once rather than line by line
+        print("\n".join(
+            f"{heading}\n{label}: {result[:preview]}..."
+            for (heading, label, preview, _, _, _), result in zip(queries, results)
+        ))
         
         # Step 9: Show processing statistics
         print("\n📈 Processing Statistics:")
@@ -308,11 +363,11 @@ async def cleanup_multimodal_example():
     """Clean up multimodal example data"""
     print("\n🧹 Cleaning up multimodal example data...")
     
-    import shutil
+    from raganything.utils import fast_rmtree
     storage_dir = Path("./bedrock_multimodal_storage")
     
     if storage_dir.exists():
-        shutil.rmtree(storage_dir)
+        fast_rmtree(storage_dir)
         print("✅ Cleaned up multimodal storage directory")
 
 
@@ -10,15 +10,18 @@ This demo compares:
 5. Feature capabilities
 """
 
+import argparse
 import asyncio
 import os
 import sys
 import time
-import statistics
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Optional, Tuple
 import json
 
+import numpy as np
+
 # Add project root to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
@@ -27,12 +30,114 @@ from raganything import RAGAnything, RAGAnythingConfig
 from raganything.bedrock import BedrockConfig
 
 
+SAMPLE_CONTENT = [
+    {
+        "type": "text",
+        "text": """
+        Artificial Intelligence Comprehensive Guide
+        
+        Artificial Intelligence (AI) is a transformative technology that enables machines 
+        to perform tasks that typically require human intelligence. This includes learning, 
+        reasoning, problem-solving, perception, and language understanding.
+        
+        Key AI Technologies:
+        
+        1. Machine Learning (ML)
+           - Supervised Learning: Learning from labeled data
+           - Unsupervised Learning: Finding patterns in unlabeled data
+           - Reinforcement Learning: Learning through trial and error
+        
+        2. Deep Learning
+           - Neural Networks: Inspired by the human brain
+           - Convolutional Neural Networks (CNNs): For image processing
+           - Recurrent Neural Networks (RNNs): For sequential data
+           - Transformers: For natural language processing
+        
+        3. Natural Language Processing (NLP)
+           - Text analysis and understanding
+           - Language generation and translation
+           - Sentiment analysis and entity recognition
+           - Question answering systems
+        
+        4. Computer Vision
+           - Image recognition and classification
+           - Object detection and tracking
+           - Facial recognition systems
+           - Medical image analysis
+        
+        Applications in Healthcare:
+        - Medical diagnosis and imaging
+        - Drug discovery and development
+        - Personalized treatment plans
+        - Robotic surgery assistance
+        - Electronic health record analysis
+        
+        Ethical Considerations:
+        - Bias and fairness in AI systems
+        - Privacy and data protection
+        - Transparency and explainability
+        - Job displacement concerns
+        - Autonomous decision-making responsibility
+        
+        The future of AI holds immense potential for solving complex global challenges
+        while requiring careful consideration of ethical implications and societal impact.
+        """,
+        "page_idx": 0
+    }
+]
+
+# Claude models under test, selectable with --models
+BEDROCK_MODELS = {
+    'sonnet': {
+        'name': 'Claude 3.5 Sonnet',
+        'model_id': 'anthropic.claude-3-5-sonnet-20241022-v2:0',
+        'description': 'High-quality responses'
+    },
+    'haiku': {
+        'name': 'Claude 3 Haiku',
+        'model_id': 'anthropic.claude-3-haiku-20240307-v1:0',
+        'description': 'Fast responses'
+    },
+}
+
+
+@dataclass
+class ModelTrace:
+    """Query results for one model, stored column-wise
+
+    ``times``, ``lengths`` and (when streaming) ``ttft`` hold one entry per
+    successful query and ``queries`` the index of that query in the test set.
+    """
+    times: np.ndarray
+    lengths: np.ndarray
+    queries: List[int]
+    errors: List[Tuple[int, str]]
+    ttft: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.float64))
+
+    @property
+    def success_rate(self) -> float:
+        total = len(self.queries) + len(self.errors)
+        return len(self.queries) / total * 100 if total else 0.0
+
+
 class PerformanceComparison:
     """Performance comparison between Bedrock and OpenAI implementations"""
     
-    def __init__(self):
+    def __init__(
+        self,
+        measure_ttft: bool = True,
+        num_queries: int = 5,
+        concurrency: Optional[int] = None,
+        models: Optional[List[str]] = None,
+    ):
         self.bedrock_rag = None
         self.openai_rag = None
+        # Stream Bedrock responses to record time to first token as well as total time
+        self.measure_ttft = measure_ttft
+        self.num_queries = num_queries
+        # In-flight queries per model; defaults to the Bedrock config's max_concurrent_requests
+        self.concurrency = concurrency
+        self.models = models or list(BEDROCK_MODELS)
         self.test_queries = [
             "What is artificial intelligence and how does it work?",
             "Explain the differences between machine learning and deep learning",
@@ -45,9 +150,9 @@ class PerformanceComparison:
             "What are the challenges in computer vision?",
             "Explain the concept of reinforcement learning"
         ]
-        self.results = {
-            'bedrock': {'times': [], 'responses': [], 'errors': []},
-            'openai': {'times': [], 'responses': [], 'errors': []}
+        self.results: Dict[str, Dict[str, ModelTrace]] = {
+            'bedrock': {},
+            'openai': {}
         }
     
     async def setup_bedrock_rag(self) -> bool:
@@ -70,7 +175,8 @@ class PerformanceComparison:
                 claude_haiku_model_id="anthropic.claude-3-haiku-20240307-v1:0",
                 titan_embedding_model_id="amazon.titan-embed-text-v2:0",
                 max_tokens=4096,
-                temperature=0.7
+                temperature=0.7,
+                embedding_cache_enabled=True  # Skip re-embedding the sample content on re-runs
             )
             
             self.bedrock_rag = BedrockRAGAnything(
@@ -79,6 +185,11 @@ class PerformanceComparison:
             )
             
             if await self.bedrock_rag.validate_bedrock_access():
+                # Open the connections the concurrent queries will use, so TLS
+                # setup is not counted in the first measured response times
+                await self.bedrock_rag.bedrock_auth.prewarm(
+                    connections=bedrock_config.max_concurrent_requests
+                )
                 print("✅ Bedrock RAG setup successful")
                 return True
             else:
@@ -114,228 +225,166 @@ class PerformanceComparison:
         """Add sample content for testing"""
         print("📝 Adding sample content for comparison...")
         
-        sample_content = [
-            {
-                "type": "text",
-                "text": """
-                Artificial Intelligence Comprehensive Guide
-                
-                Artificial Intelligence (AI) is a transformative technology that enables machines 
-                to perform tasks that typically require human intelligence. This includes learning, 
-                reasoning, problem-solving, perception, and language understanding.
-                
-                Key AI Technologies:
-                
-                1. Machine Learning (ML)
-                   - Supervised Learning: Learning from labeled data
-                   - Unsupervised Learning: Finding patterns in unlabeled data
-                   - Reinforcement Learning: Learning through trial and error
-                
-                2. Deep Learning
-                   - Neural Networks: Inspired by the human brain
-                   - Convolutional Neural Networks (CNNs): For image processing
-                   - Recurrent Neural Networks (RNNs): For sequential data
-                   - Transformers: For natural language processing
-                
-                3. Natural Language Processing (NLP)
-                   - Text analysis and understanding
-                   - Language generation and translation
-                   - Sentiment analysis and entity recognition
-                   - Question answering systems
-                
-                4. Computer Vision
-                   - Image recognition and classification
-                   - Object detection and tracking
-                   - Facial recognition systems
-                   - Medical image analysis
-                
-                Applications in Healthcare:
-                - Medical diagnosis and imaging
-                - Drug discovery and development
-                - Personalized treatment plans
-                - Robotic surgery assistance
-                - Electronic health record analysis
-                
-                Ethical Considerations:
-                - Bias and fairness in AI systems
-                - Privacy and data protection
-                - Transparency and explainability
-                - Job displacement concerns
-                - Autonomous decision-making responsibility
-                
-                The future of AI holds immense potential for solving complex global challenges
-                while requiring careful consideration of ethical implications and societal impact.
-                """,
-                "page_idx": 0
-            }
-        ]
-        
         # Add content to Bedrock RAG
         if self.bedrock_rag:
+            # No doc_id: the ID is derived from the content, so an unchanged
+            # sample is recognised by LightRAG's document status on later runs
+            # and not re-chunked or re-embedded, while an edited one is
+            # inserted afresh
             await self.bedrock_rag.insert_content_list(
-                content_list=sample_content,
-                file_path="ai_comprehensive_guide.txt",
-                doc_id="ai-guide-comparison-001"
+                content_list=SAMPLE_CONTENT,
+                file_path="ai_comprehensive_guide.txt"
             )
             print("✅ Content added to Bedrock RAG")
     
-    async def run_bedrock_queries(self) -> Dict[str, Any]:
+    async def run_bedrock_queries(self) -> Dict[str, ModelTrace]:
         """Run test queries on Bedrock RAG"""
         print("\n🚀 Running queries on AWS Bedrock...")
         
-        bedrock_results = {
-            'times': [],
-            'responses': [],
-            'errors': [],
-            'model_info': {}
-        }
-        
-        # Test different Claude models
-        models_to_test = [
-            {
-                'name': 'Claude 3.5 Sonnet',
-                'model_id': 'anthropic.claude-3-5-sonnet-20241022-v2:0',
-                'description': 'High-quality responses'
-            },
-            {
-                'name': 'Claude 3 Haiku', 
-                'model_id': 'anthropic.claude-3-haiku-20240307-v1:0',
-                'description': 'Fast responses'
-            }
-        ]
+        bedrock_results: Dict[str, ModelTrace] = {}
+        queries = self.test_queries[:self.num_queries]
+        n_queries = len(queries)
         
-        for model_info in models_to_test:
+        for model_info in (BEDROCK_MODELS[key] for key in self.models):
             print(f"\n🤖 Testing {model_info['name']} ({model_info['description']})")
-            model_results = {
-                'times': [],
-                'responses': [],
-                'errors': []
-            }
+            model_results = ModelTrace(
+                times=np.empty(n_queries, dtype=np.float64),
+                lengths=np.empty(n_queries, dtype=np.int32),
+                queries=[],
+                errors=[],
+                ttft=np.empty(n_queries if self.measure_ttft else 0, dtype=np.float64)
+            )
             
             # Update model configuration
             self.bedrock_rag.bedrock_config.claude_model_id = model_info['model_id']
             
-            for i, query in enumerate(self.test_queries[:5], 1):  # Test first 5 queries
-                print(f"  Query {i}: {query[:50]}...")
+            # Queries are independent, so run them concurrently; the semaphore
+            # keeps the number of in-flight Bedrock calls within the configured limit
+            semaphore = asyncio.Semaphore(
+                self.concurrency or self.bedrock_rag.bedrock_config.max_concurrent_requests
+            )
+            
+            async def run_query(query: str):
+                async with semaphore:
+                    start_ns = time.perf_counter_ns()
+                    first_token_ns = None
+                    try:
+                        if self.measure_ttft:
+                            chunks = []
+                            async for chunk in self.bedrock_rag.aquery_stream(query, mode="hybrid"):
+                                if first_token_ns is None:
+                                    first_token_ns = time.perf_counter_ns() - start_ns
+                                chunks.append(chunk)
+                            response = "".join(chunks)
+                        else:
+                            response = await self.bedrock_rag.aquery(query, mode="hybrid")
+                        return response, time.perf_counter_ns() - start_ns, first_token_ns, None
+                    except Exception as e:
+                        return None, time.perf_counter_ns() - start_ns, first_token_ns, e
+            
+            outcomes = await asyncio.gather(*(run_query(q) for q in queries))
+            
+            succeeded = 0
+            for i, (query, (response, elapsed_ns, first_token_ns, error)) in enumerate(
+                zip(queries, outcomes)
+            ):
+                print(f"  Query {i + 1}: {query[:50]}...")
                 
-                start_time = time.time()
-                try:
-                    response = await self.bedrock_rag.aquery(query, mode="hybrid")
-                    response_time = time.time() - start_time
-                    
-                    model_results['times'].append(response_time)
-                    model_results['responses'].append({
-                        'query': query,
-                        'response': response,
-                        'length': len(response)
-                    })
+                if error is None:
+                    response_time = elapsed_ns / 1e9
+                    model_results.times[succeeded] = response_time
+                    model_results.lengths[succeeded] = len(response)
+                    model_results.queries.append(i)
                     
-                    print(f"    ✅ Response time: {response_time:.2f}s")
-                    
-                except Exception as e:
-                    error_time = time.time() - start_time
-                    model_results['errors'].append({
-                        'query': query,
-                        'error': str(e),
-                        'time': error_time
-                    })
-                    print(f"    ❌ Error: {str(e)}")
-                
-                # Small delay between queries
-                await asyncio.sleep(0.5)
+                    if self.measure_ttft:
+                        # An empty response has no first token; count it at completion
+                        ttft = (first_token_ns if first_token_ns is not None else elapsed_ns) / 1e9
+                        model_results.ttft[succeeded] = ttft
+                        print(f"    ✅ Response time: {response_time:.2f}s (first token {ttft:.2f}s)")
+                    else:
+                        print(f"    ✅ Response time: {response_time:.2f}s")
+                    succeeded += 1
+                else:
+                    model_results.errors.append((i, str(error)))
+                    print(f"    ❌ Error: {str(error)}")
             
-            bedrock_results['model_info'][model_info['name']] = model_results
+            # Drop the unused tail of the pre-allocated columns
+            model_results.times = model_results.times[:succeeded]
+            model_results.lengths = model_results.lengths[:succeeded]
+            model_results.ttft = model_results.ttft[:succeeded]
+            bedrock_results[model_info['name']] = model_results
         
         return bedrock_results
     
-    async def simulate_openai_queries(self) -> Dict[str, Any]:
+    async def simulate_openai_queries(self) -> Dict[str, ModelTrace]:
         """Simulate OpenAI queries for comparison"""
         print("\n🔄 Simulating OpenAI queries for comparison...")
         
         # Simulated OpenAI results based on typical performance
+        query_indices = list(range(len(self.test_queries[:self.num_queries])))
         openai_results = {
-            'times': [],
-            'responses': [],
-            'errors': [],
-            'model_info': {
-                'GPT-4': {
-                    'times': [2.1, 2.3, 1.9, 2.5, 2.0],  # Simulated response times
-                    'responses': [
-                        {
-                            'query': query,
-                            'response': f"[Simulated GPT-4 response to: {query}] This would be a comprehensive response from GPT-4 covering the key aspects of the question with detailed explanations and examples.",
-                            'length': 250
-                        } for query in self.test_queries[:5]
-                    ],
-                    'errors': []
-                },
-                'GPT-3.5-Turbo': {
-                    'times': [0.8, 0.9, 0.7, 1.1, 0.8],  # Faster simulated times
-                    'responses': [
-                        {
-                            'query': query,
-                            'response': f"[Simulated GPT-3.5 response to: {query}] This would be a good response from GPT-3.5 Turbo with relevant information.",
-                            'length': 180
-                        } for query in self.test_queries[:5]
-                    ],
-                    'errors': []
-                }
-            }
+            'GPT-4': ModelTrace(
+                # Simulated response times, repeated to cover the query count
+                times=np.resize([2.1, 2.3, 1.9, 2.5, 2.0], len(query_indices)),
+                lengths=np.full(len(query_indices), 250, dtype=np.int32),
+                queries=query_indices,
+                errors=[]
+            ),
+            'GPT-3.5-Turbo': ModelTrace(
+                times=np.resize([0.8, 0.9, 0.7, 1.1, 0.8], len(query_indices)),  # Faster simulated times
+                lengths=np.full(len(query_indices), 180, dtype=np.int32),
+                queries=query_indices,
+                errors=[]
+            )
         }
         
         print("✅ OpenAI simulation completed")
         return openai_results
     
-    def analyze_performance(self, bedrock_results: Dict, openai_results: Dict):
+    @staticmethod
+    def _print_model_stats(model_name: str, results: ModelTrace, success_rate: str):
+        """Print timing and length statistics for one model"""
+        times = results.times
+        # Min, percentiles and max come out of a single sort of the timings
+        t_min, p50, p95, p99, t_max = np.quantile(times, [0.0, 0.5, 0.95, 0.99, 1.0])
+        
+        print(f"  {model_name}:")
+        print(f"    Average Response Time: {times.mean():.2f}s (std {times.std():.2f}s)")
+        print(f"    Min/Max Response Time: {t_min:.2f}s / {t_max:.2f}s")
+        print(f"    P50/P95/P99 Response Time: {p50:.2f}s / {p95:.2f}s / {p99:.2f}s")
+        if len(results.ttft):
+            print(f"    Average Time to First Token: {results.ttft.mean():.2f}s")
+        print(f"    Success Rate: {success_rate}")
+        print(f"    Queries Processed: {len(results.queries)}")
+        print(f"    Average Response Length: {results.lengths.mean():.0f} characters")
+    
+    def analyze_performance(
+        self, bedrock_results: Dict[str, ModelTrace], openai_results: Dict[str, ModelTrace]
+    ):
         """Analyze and compare performance metrics"""
         print("\n📊 Performance Analysis")
         print("=" * 60)
         
         # Bedrock Analysis
         print("\n🔵 AWS Bedrock Results:")
-        for model_name, results in bedrock_results['model_info'].items():
-            if results['times']:
-                avg_time = statistics.mean(results['times'])
-                min_time = min(results['times'])
-                max_time = max(results['times'])
-                success_rate = len(results['responses']) / (len(results['responses']) + len(results['errors'])) * 100
-                
-                print(f"  {model_name}:")
-                print(f"    Average Response Time: {avg_time:.2f}s")
-                print(f"    Min/Max Response Time: {min_time:.2f}s / {max_time:.2f}s")
-                print(f"    Success Rate: {success_rate:.1f}%")
-                print(f"    Queries Processed: {len(results['responses'])}")
-                
-                if results['responses']:
-                    avg_length = statistics.mean([r['length'] for r in results['responses']])
-                    print(f"    Average Response Length: {avg_length:.0f} characters")
+        for model_name, results in bedrock_results.items():
+            if len(results.times):
+                self._print_model_stats(model_name, results, f"{results.success_rate:.1f}%")
         
         # OpenAI Analysis (Simulated)
         print("\n🟢 OpenAI Results (Simulated):")
-        for model_name, results in openai_results['model_info'].items():
-            if results['times']:
-                avg_time = statistics.mean(results['times'])
-                min_time = min(results['times'])
-                max_time = max(results['times'])
-                
-                print(f"  {model_name}:")
-                print(f"    Average Response Time: {avg_time:.2f}s")
-                print(f"    Min/Max Response Time: {min_time:.2f}s / {max_time:.2f}s")
-                print(f"    Success Rate: 100.0% (simulated)")
-                print(f"    Queries Processed: {len(results['responses'])}")
-                
-                if results['responses']:
-                    avg_length = statistics.mean([r['length'] for r in results['responses']])
-                    print(f"    Average Response Length: {avg_length:.0f} characters")
+        for model_name, results in openai_results.items():
+            if len(results.times):
+                self._print_model_stats(model_name, results, "100.0% (simulated)")
         
         # Comparison Summary
         print("\n⚖️  Comparison Summary:")
         
         # Get Bedrock Claude 3.5 Sonnet results
-        sonnet_results = bedrock_results['model_info'].get('Claude 3.5 Sonnet', {})
-        haiku_results = bedrock_results['model_info'].get('Claude 3 Haiku', {})
-        gpt4_results = openai_results['model_info'].get('GPT-4', {})
-        gpt35_results = openai_results['model_info'].get('GPT-3.5-Turbo', {})
+        sonnet_results = bedrock_results.get('Claude 3.5 Sonnet')
+        haiku_results = bedrock_results.get('Claude 3 Haiku')
+        gpt4_results = openai_results.get('GPT-4')
+        gpt35_results = openai_results.get('GPT-3.5-Turbo')
         
         comparisons = [
             ("Quality Models", "Claude 3.5 Sonnet", sonnet_results, "GPT-4", gpt4_results),
@@ -345,9 +394,9 @@ class PerformanceComparison:
         for category, bedrock_model, bedrock_data, openai_model, openai_data in comparisons:
             print(f"\n  {category} Comparison:")
             
-            if bedrock_data.get('times') and openai_data.get('times'):
-                bedrock_avg = statistics.mean(bedrock_data['times'])
-                openai_avg = statistics.mean(openai_data['times'])
+            if bedrock_data and openai_data and len(bedrock_data.times) and len(openai_data.times):
+                bedrock_avg = bedrock_data.times.mean()
+                openai_avg = openai_data.times.mean()
                 
                 print(f"    {bedrock_model}: {bedrock_avg:.2f}s average")
                 print(f"    {openai_model}: {openai_avg:.2f}s average")
@@ -422,6 +471,8 @@ class PerformanceComparison:
             # Run comparisons
             bedrock_results = await self.run_bedrock_queries()
             openai_results = await self.simulate_openai_queries()
+            self.results['bedrock'] = bedrock_results
+            self.results['openai'] = openai_results
             
             # Analyze results
             self.analyze_performance(bedrock_results, openai_results)
@@ -438,20 +489,34 @@ class PerformanceComparison:
 
 async def main():
     """Main function"""
+    parser = argparse.ArgumentParser(description="RAG Anything Performance Comparison: AWS Bedrock vs OpenAI")
+    parser.add_argument("--cleanup", action=argparse.BooleanOptionalAction, default=False,
+                        help="Clean up comparison data after completion")
+    parser.add_argument("--models", nargs="+", choices=list(BEDROCK_MODELS), default=list(BEDROCK_MODELS),
+                        help="Claude models to test")
+    parser.add_argument("--queries", type=int, default=5, help="Number of test queries to run per model")
+    parser.add_argument("--concurrency", type=int, default=None,
+                        help="Concurrent queries per model (default: BEDROCK_MAX_CONCURRENT_REQUESTS)")
+    
+    args = parser.parse_args()
+    
     print("Starting RAG Anything performance comparison...")
     
     # Check environment
     if not os.getenv("AWS_REGION"):
         print("⚠️  AWS_REGION not set, using default: us-east-1")
     
-    comparison = PerformanceComparison()
+    comparison = PerformanceComparison(
+        num_queries=args.queries,
+        concurrency=args.concurrency,
+        models=args.models,
+    )
     
     try:
         success = await comparison.run_comparison()
         
         if success:
-            cleanup = input("\n🧹 Clean up comparison data? (y/N): ").lower().strip()
-            if cleanup == 'y':
+            if args.cleanup:
                 await comparison.cleanup_comparison_data()
             
             print("\n✅ Performance comparison completed successfully!")
@@ -1,21 +1,25 @@
 from .raganything import RAGAnything as RAGAnything
 from .config import RAGAnythingConfig as RAGAnythingConfig
 
-# AWS Bedrock integration
-try:
-    from .bedrock_rag import BedrockRAGAnything as BedrockRAGAnything
-    from .bedrock import BedrockConfig as BedrockConfig
-    _bedrock_available = True
-except ImportError:
-    _bedrock_available = False
-    BedrockRAGAnything = None
-    BedrockConfig = None
-
 __version__ = "1.2.8"
 __author__ = "Zirui Guo"
 __url__ = "https://github.com/HKUDS/RAG-Anything"
 
-if _bedrock_available:
-    __all__ = ["RAGAnything", "RAGAnythingConfig", "BedrockRAGAnything", "BedrockConfig"]
-else:
-    __all__ = ["RAGAnything", "RAGAnythingConfig"]
+__all__ = ["RAGAnything", "RAGAnythingConfig", "BedrockRAGAnything", "BedrockConfig"]
+
+_BEDROCK_EXPORTS = ("BedrockRAGAnything", "BedrockConfig")
+
+
+def __getattr__(name):
+    # AWS Bedrock integration pulls in boto3 and the provider stack, so it is
+    # imported on first use rather than with the package. Both names resolve
+    # to None when its dependencies are not installed.
+    if name in _BEDROCK_EXPORTS:
+        try:
+            from .bedrock_rag import BedrockRAGAnything
+            from .bedrock import BedrockConfig
+        except ImportError:
+            BedrockRAGAnything = BedrockConfig = None
+        globals().update(BedrockRAGAnything=BedrockRAGAnything, BedrockConfig=BedrockConfig)
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
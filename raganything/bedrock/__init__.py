@@ -9,12 +9,16 @@ from .auth import BedrockAuthenticator
 from .llm_provider import BedrockLLMProvider
 from .vision_provider import BedrockVisionProvider
 from .embedding_provider import BedrockEmbeddingProvider
-from .rag_anything import BedrockRAGAnything
+from .batch_inference import BedrockBatchEmbedder
+from .semantic_cache import SemanticCache
+from .embedding_cache import DiskEmbeddingCache
+from .query_validator import QueryValidator
 from .exceptions import (
     BedrockError,
     BedrockConfigurationError,
     BedrockAuthenticationError,
     BedrockModelError,
+    BedrockEmbeddingError,
     BedrockTimeoutError,
 )
 
@@ -24,10 +28,24 @@ __all__ = [
     "BedrockLLMProvider",
     "BedrockVisionProvider",
     "BedrockEmbeddingProvider",
+    "BedrockBatchEmbedder",
+    "SemanticCache",
+    "DiskEmbeddingCache",
+    "QueryValidator",
     "BedrockRAGAnything",
     "BedrockError",
     "BedrockConfigurationError",
     "BedrockAuthenticationError",
     "BedrockModelError",
+    "BedrockEmbeddingError",
     "BedrockTimeoutError",
-]
\ No newline at end of file
+]
+
+
+def __getattr__(name):
+    # BedrockRAGAnything lives in raganything.bedrock_rag, which imports this
+    # package; resolve it lazily to avoid a circular import.
+    if name == "BedrockRAGAnything":
+        from ..bedrock_rag import BedrockRAGAnything
+        return BedrockRAGAnything
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
\ No newline at end of file
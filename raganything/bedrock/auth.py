@@ -3,31 +3,121 @@ AWS Bedrock authentication and client management
 """
 
 import asyncio
+import functools
 import logging
-from typing import Optional, Any
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Any, Callable, Dict, FrozenSet, List, Tuple
 import boto3
 from botocore.exceptions import ClientError, NoCredentialsError, PartialCredentialsError
 from botocore.config import Config
 
 from .config import BedrockConfig
 from .exceptions import BedrockAuthenticationError, BedrockConfigurationError
+from . import serialization
 
 
 logger = logging.getLogger(__name__)
 
 
+# Held across cache lookups so authenticators racing on a miss (their clients
+# are built in worker threads) share one session and client instead of each
+# loading the service models and credential chain
+_cache_lock = threading.RLock()
+
+
+@functools.lru_cache(maxsize=4)
+def _cached_session(profile_name: Optional[str]) -> boto3.Session:
+    if profile_name:
+        return boto3.Session(profile_name=profile_name)
+    return boto3.Session()
+
+
+def _get_session(profile_name: Optional[str]) -> boto3.Session:
+    """Return a shared boto3 session for the given profile"""
+    with _cache_lock:
+        return _cached_session(profile_name)
+
+
+@functools.lru_cache(maxsize=8)
+def _cached_client(
+    service_name: str,
+    region_name: str,
+    profile_name: Optional[str],
+    max_attempts: int,
+    max_concurrent_requests: int,
+    read_timeout: int,
+) -> Any:
+    client_config = Config(
+        region_name=region_name,
+        retries={
+            'max_attempts': max_attempts,
+            'mode': 'adaptive'
+        },
+        # Headroom over the expected in-flight requests so bursts (and
+        # connections still draining a stream) never wait for a free slot
+        # or open a fresh TLS connection
+        max_pool_connections=max(32, 2 * max_concurrent_requests),
+        read_timeout=read_timeout,
+        # A TCP connect that takes longer than this is retried rather than waited on
+        connect_timeout=5,
+        tcp_keepalive=True,
+    )
+    return _get_session(profile_name).client(service_name, config=client_config)
+
+
+def _get_client(
+    service_name: str,
+    region_name: str,
+    profile_name: Optional[str],
+    max_attempts: int,
+    max_concurrent_requests: int,
+    read_timeout: int,
+) -> Any:
+    """Return a shared client so the botocore service model is parsed once per process"""
+    with _cache_lock:
+        return _cached_client(
+            service_name,
+            region_name,
+            profile_name,
+            max_attempts,
+            max_concurrent_requests,
+            read_timeout,
+        )
+
+
+def _clear_cached_clients() -> None:
+    """Drop shared sessions and clients so the next lookup builds fresh ones"""
+    with _cache_lock:
+        _cached_client.cache_clear()
+        _cached_session.cache_clear()
+
+
 class BedrockAuthenticator:
     """Handle AWS authentication and Bedrock client management"""
     
+    # Seconds to reuse a list_foundation_models response
+    FOUNDATION_MODELS_TTL = 3600
+    
     def __init__(self, config: BedrockConfig):
         self.config = config
         self.session = None
         self.bedrock_client = None
         self.bedrock_runtime_client = None
         self._client_lock = asyncio.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # (timestamp, model IDs) from the last list_foundation_models call
+        self._foundation_models: Optional[Tuple[float, FrozenSet[str]]] = None
+        # Caller identity is fixed for the life of the credentials
+        self._identity: Optional[dict] = None
         
     async def get_bedrock_client(self) -> Any:
         """Get authenticated Bedrock client with automatic refresh"""
+        # Checked before and after taking the lock: once the client exists,
+        # callers return without contending on the lock
+        if self.bedrock_client is not None:
+            return self.bedrock_client
         async with self._client_lock:
             if self.bedrock_client is None:
                 await self._create_clients()
@@ -35,44 +125,101 @@ class BedrockAuthenticator:
     
     async def get_bedrock_runtime_client(self) -> Any:
         """Get authenticated Bedrock Runtime client with automatic refresh"""
+        if self.bedrock_runtime_client is not None:
+            return self.bedrock_runtime_client
         async with self._client_lock:
             if self.bedrock_runtime_client is None:
                 await self._create_clients()
             return self.bedrock_runtime_client
     
+    async def run_in_executor(self, func: Callable, *args, **kwargs) -> Any:
+        """Run a blocking boto3 call on the authenticator's thread pool
+        
+        The pool has one worker per pooled HTTP connection
+        (``max_concurrent_requests``), so concurrent calls overlap without
+        queueing behind unrelated work on the default executor.
+        """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.config.max_concurrent_requests,
+                thread_name_prefix="bedrock"
+            )
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+    
+    async def ainvoke_model(self, **kwargs) -> Any:
+        """Call bedrock-runtime InvokeModel without blocking the event loop"""
+        client = await self.get_bedrock_runtime_client()
+        return await self.run_in_executor(client.invoke_model, **kwargs)
+    
+    async def ainvoke_model_json(self, **kwargs) -> Any:
+        """Call InvokeModel and return the decoded JSON response body
+        
+        The body is read and parsed in the worker thread as well, so the
+        socket read does not run on the event loop.
+        """
+        client = await self.get_bedrock_runtime_client()
+        
+        def invoke() -> Any:
+            return serialization.loads(client.invoke_model(**kwargs)['body'].read())
+        
+        return await self.run_in_executor(invoke)
+    
+    async def ainvoke_model_with_response_stream(self, **kwargs) -> Any:
+        """Call bedrock-runtime InvokeModelWithResponseStream without blocking the event loop"""
+        client = await self.get_bedrock_runtime_client()
+        return await self.run_in_executor(client.invoke_model_with_response_stream, **kwargs)
+    
+    async def prewarm(self, connections: int = 1) -> None:
+        """Open connections to Bedrock ahead of latency-sensitive calls
+        
+        Resolves credentials, fetches the foundation model listing on the
+        control-plane client and sends ``connections`` concurrent one-word
+        Titan embedding requests, so that many runtime connections are in the
+        pool with TLS already negotiated. The embedding calls cost a few
+        tokens; errors are logged and ignored.
+        
+        Args:
+            connections: Number of runtime connections to open
+        """
+        try:
+            await self._get_foundation_model_ids()
+            body = serialization.dumps({"inputText": "ping"})
+            # Reading the body releases each connection back to the pool
+            await asyncio.gather(*(
+                self.ainvoke_model_json(
+                    modelId=self.config.titan_embedding_model_id,
+                    body=body,
+                    contentType="application/json",
+                    accept="application/json"
+                )
+                for _ in range(max(1, connections))
+            ))
+            logger.info("Prewarmed %d Bedrock runtime connections", max(1, connections))
+        except Exception as e:
+            logger.warning("Bedrock connection prewarm failed: %s", e)
+    
     async def _create_clients(self):
         """Create Bedrock clients with proper configuration"""
         try:
-            # Create boto3 session
-            if self.config.aws_profile:
-                self.session = boto3.Session(profile_name=self.config.aws_profile)
-            else:
-                self.session = boto3.Session()
+            self.session = await asyncio.to_thread(_get_session, self.config.aws_profile)
             
-            # Configure boto3 client settings
-            client_config = Config(
-                region_name=self.config.aws_region,
-                retries={
-                    'max_attempts': self.config.retry_max_attempts,
-                    'mode': 'adaptive'
-                },
-                max_pool_connections=self.config.max_concurrent_requests,
-                read_timeout=self.config.request_timeout,
-                connect_timeout=30,
+            # Clients are shared between authenticators with identical settings
+            client_args = (
+                self.config.aws_region,
+                self.config.aws_profile,
+                self.config.retry_max_attempts,
+                self.config.max_concurrent_requests,
+                self.config.request_timeout,
             )
-            
-            # Create Bedrock clients
-            self.bedrock_client = self.session.client(
-                'bedrock',
-                config=client_config
+            # Building a client loads service models and resolves credentials,
+            # so it runs in a worker thread rather than on the event loop
+            self.bedrock_client = await asyncio.to_thread(_get_client, 'bedrock', *client_args)
+            self.bedrock_runtime_client = await asyncio.to_thread(
+                _get_client, 'bedrock-runtime', *client_args
             )
             
-            self.bedrock_runtime_client = self.session.client(
-                'bedrock-runtime',
-                config=client_config
-            )
-            
-            logger.info(f"Created Bedrock clients for region: {self.config.aws_region}")
+            logger.info("Created Bedrock clients for region: %s", self.config.aws_region)
             
         except (NoCredentialsError, PartialCredentialsError) as e:
             error_msg = f"AWS credentials not found or incomplete: {str(e)}"
@@ -90,14 +237,8 @@ class BedrockAuthenticator:
     async def validate_permissions(self) -> bool:
         """Validate that the credentials have required Bedrock permissions"""
         try:
-            client = await self.get_bedrock_client()
-            
-            # Test basic Bedrock access by listing foundation models
-            response = client.list_foundation_models()
-            models = response.get('modelSummaries', [])
-            
             # Check if required models are available
-            available_model_ids = {model['modelId'] for model in models}
+            available_model_ids = await self._get_foundation_model_ids()
             
             required_models = [
                 self.config.claude_model_id,
@@ -128,16 +269,43 @@ class BedrockAuthenticator:
             logger.error(error_msg)
             raise BedrockAuthenticationError(error_msg) from e
     
+    async def _get_foundation_model_ids(self) -> FrozenSet[str]:
+        """Return the IDs of available foundation models
+        
+        The catalogue changes rarely, so the listing is reused for
+        ``FOUNDATION_MODELS_TTL`` seconds instead of calling the control
+        plane on every validation.
+        """
+        if self._foundation_models is not None:
+            fetched_at, model_ids = self._foundation_models
+            if time.monotonic() - fetched_at < self.FOUNDATION_MODELS_TTL:
+                return model_ids
+        
+        client = await self.get_bedrock_client()
+        
+        # Test basic Bedrock access by listing foundation models
+        response = await asyncio.to_thread(client.list_foundation_models)
+        models = response.get('modelSummaries', [])
+        model_ids = frozenset(model['modelId'] for model in models)
+        
+        self._foundation_models = (time.monotonic(), model_ids)
+        return model_ids
+    
     async def test_model_access(self, model_id: str) -> bool:
         """Test access to a specific model"""
         try:
             client = await self.get_bedrock_client()
             
             # Get model details to verify access
-            response = client.get_foundation_model(modelIdentifier=model_id)
+            response = await asyncio.to_thread(
+                client.get_foundation_model, modelIdentifier=model_id
+            )
             
-            model_details = response.get('modelDetails', {})
-            logger.info(f"Successfully accessed model {model_id}: {model_details.get('modelName', 'Unknown')}")
+            if logger.isEnabledFor(logging.INFO):
+                model_details = response.get('modelDetails', {})
+                logger.info(
+                    "Successfully accessed model %s: %s", model_id, model_details.get('modelName', 'Unknown')
+                )
             return True
             
         except ClientError as e:
@@ -156,11 +324,30 @@ class BedrockAuthenticator:
             logger.error(error_msg)
             raise BedrockAuthenticationError(error_msg) from e
     
+    async def validate_models(self, model_ids: List[str]) -> Dict[str, bool]:
+        """Check access to several models at once
+        
+        Resolved from the cached foundation model listing when it is fresh,
+        otherwise the per-model checks run concurrently.
+        """
+        if self._foundation_models is not None:
+            fetched_at, available_model_ids = self._foundation_models
+            if time.monotonic() - fetched_at < self.FOUNDATION_MODELS_TTL:
+                return {model_id: model_id in available_model_ids for model_id in model_ids}
+        
+        async def check(model_id: str) -> bool:
+            try:
+                return await self.test_model_access(model_id)
+            except BedrockAuthenticationError:
+                return False
+        
+        results = await asyncio.gather(*(check(model_id) for model_id in model_ids))
+        return dict(zip(model_ids, results))
+    
     def handle_auth_error(self, error: Exception) -> None:
         """Handle authentication errors with appropriate logging"""
         if isinstance(error, ClientError):
             error_code = error.response.get('Error', {}).get('Code', 'Unknown')
-            error_message = error.response.get('Error', {}).get('Message', str(error))
             
             if error_code == 'UnauthorizedOperation':
                 logger.error("Unauthorized operation. Check IAM permissions for Bedrock access.")
@@ -169,31 +356,50 @@ class BedrockAuthenticator:
             elif error_code == 'TokenRefreshRequired':
                 logger.error("AWS credentials expired. Refresh credentials or check IAM role.")
             else:
-                logger.error(f"AWS error {error_code}: {error_message}")
+                error_message = error.response.get('Error', {}).get('Message') or str(error)
+                logger.error("AWS error %s: %s", error_code, error_message)
         else:
-            logger.error(f"Authentication error: {str(error)}")
+            logger.error("Authentication error: %s", error)
     
     async def refresh_clients(self):
         """Force refresh of Bedrock clients"""
         async with self._client_lock:
             self.bedrock_client = None
             self.bedrock_runtime_client = None
+            self._foundation_models = None
+            self._identity = None
+            _clear_cached_clients()
             await self._create_clients()
             logger.info("Refreshed Bedrock clients")
     
     def get_caller_identity(self) -> dict:
         """Get AWS caller identity for debugging"""
+        if self._identity is not None:
+            return self._identity
         try:
-            sts_client = self.session.client('sts')
-            return sts_client.get_caller_identity()
+            sts_client = _get_client(
+                'sts',
+                self.config.aws_region,
+                self.config.aws_profile,
+                self.config.retry_max_attempts,
+                self.config.max_concurrent_requests,
+                self.config.request_timeout,
+            )
+            self._identity = sts_client.get_caller_identity()
+            return self._identity
         except Exception as e:
-            logger.error(f"Failed to get caller identity: {str(e)}")
+            logger.error("Failed to get caller identity: %s", e)
             return {}
     
     def close(self):
-        """Clean up resources"""
-        if self.bedrock_client:
-            self.bedrock_client.close()
-        if self.bedrock_runtime_client:
-            self.bedrock_runtime_client.close()
+        """Clean up resources
+        
+        Clients are shared across authenticators, so this only drops this
+        instance's references; pooled connections are released at exit.
+        """
+        self.bedrock_client = None
+        self.bedrock_runtime_client = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
         logger.info("Closed Bedrock clients")
\ No newline at end of file
@@ -0,0 +1,205 @@
+"""
+AWS Bedrock Batch Inference for Titan embeddings and Claude completions
+
+Batch inference jobs read JSONL records from S3 and write results back to S3.
+They are priced below on-demand invocation and are not bound by the on-demand
+request quotas, which suits offline ingestion where latency does not matter.
+"""
+
+import asyncio
+import logging
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple, Type
+from urllib.parse import urlparse
+
+from botocore.exceptions import ClientError
+
+from .config import BedrockConfig
+from .auth import BedrockAuthenticator, _get_client
+from .exceptions import BedrockConfigurationError, BedrockEmbeddingError, BedrockError, BedrockModelError
+from .embedding_provider import titan_request_options
+from . import serialization
+
+
+logger = logging.getLogger(__name__)
+
+
+class BedrockBatchJobRunner:
+    """Run Bedrock model invocation jobs through the configured S3 location"""
+
+    # Bedrock rejects batch inference jobs with fewer records than this
+    MIN_RECORDS = 100
+
+    # Prefix of job names and their S3 folders
+    JOB_PREFIX = "raganything-batch"
+    # Raised when a job cannot be created or does not complete
+    error_class: Type[BedrockError] = BedrockModelError
+
+    _RUNNING_STATUSES = {"Submitted", "Validating", "Scheduled", "InProgress", "Stopping"}
+    _SUCCESS_STATUSES = {"Completed", "PartiallyCompleted"}
+
+    def __init__(self, config: BedrockConfig, authenticator: BedrockAuthenticator):
+        self.config = config
+        self.auth = authenticator
+
+    def is_configured(self) -> bool:
+        """Return True when an S3 location and service role are configured"""
+        return bool(self.config.batch_inference_s3_uri and self.config.batch_inference_role_arn)
+
+    def _s3_client(self):
+        return _get_client(
+            's3',
+            self.config.aws_region,
+            self.config.aws_profile,
+            self.config.retry_max_attempts,
+            self.config.max_concurrent_requests,
+            self.config.request_timeout,
+        )
+
+    @staticmethod
+    def _split_s3_uri(uri: str) -> Tuple[str, str]:
+        parsed = urlparse(uri)
+        return parsed.netloc, parsed.path.strip("/")
+
+    async def run_job(
+        self, model_id: str, model_inputs: List[Dict[str, Any]]
+    ) -> List[Optional[Dict[str, Any]]]:
+        """Run one invocation job over model_inputs
+
+        Returns the ``modelOutput`` of each record in input order, or None for
+        records the job failed.
+        """
+        if not self.is_configured():
+            raise BedrockConfigurationError(
+                "Batch inference requires batch_inference_s3_uri and batch_inference_role_arn"
+            )
+        if len(model_inputs) < self.MIN_RECORDS:
+            raise self.error_class(
+                f"Batch inference needs at least {self.MIN_RECORDS} records, got {len(model_inputs)}"
+            )
+
+        # The suffix keeps jobs started in the same second apart, in S3 too
+        job_name = f"{self.JOB_PREFIX}-{int(time.time())}-{uuid.uuid4().hex[:8]}"
+        bucket, prefix = self._split_s3_uri(self.config.batch_inference_s3_uri)
+        input_key = "/".join(filter(None, [prefix, job_name, "input.jsonl"]))
+        output_prefix = "/".join(filter(None, [prefix, job_name, "output"])) + "/"
+
+        records = b"\n".join(
+            serialization.dumps({"recordId": f"{index:011d}", "modelInput": model_input})
+            for index, model_input in enumerate(model_inputs)
+        )
+
+        s3 = await self.auth.run_in_executor(self._s3_client)
+        await self.auth.run_in_executor(s3.put_object, Bucket=bucket, Key=input_key, Body=records)
+
+        bedrock = await self.auth.get_bedrock_client()
+        try:
+            response = await self.auth.run_in_executor(
+                bedrock.create_model_invocation_job,
+                jobName=job_name,
+                roleArn=self.config.batch_inference_role_arn,
+                modelId=model_id,
+                inputDataConfig={
+                    "s3InputDataConfig": {"s3Uri": f"s3://{bucket}/{input_key}", "s3InputFormat": "JSONL"}
+                },
+                outputDataConfig={
+                    "s3OutputDataConfig": {"s3Uri": f"s3://{bucket}/{output_prefix}"}
+                },
+            )
+        except ClientError as e:
+            raise self.error_class(f"Failed to create batch inference job: {str(e)}") from e
+
+        job_arn = response["jobArn"]
+        logger.info(f"Submitted batch inference job {job_name} with {len(model_inputs)} records")
+
+        status = await self._wait_for_job(bedrock, job_arn)
+        logger.info(f"Batch inference job {job_name} finished with status {status}")
+
+        return await self._read_output(s3, bucket, output_prefix, len(model_inputs))
+
+    async def _wait_for_job(self, bedrock, job_arn: str) -> str:
+        while True:
+            job = await self.auth.run_in_executor(bedrock.get_model_invocation_job, jobIdentifier=job_arn)
+            status = job.get("status")
+            if status in self._SUCCESS_STATUSES:
+                return status
+            if status not in self._RUNNING_STATUSES:
+                raise self.error_class(
+                    f"Batch inference job {job_arn} ended with status {status}: {job.get('message', '')}"
+                )
+            await asyncio.sleep(self.config.batch_inference_poll_interval)
+
+    async def _read_output(
+        self, s3, bucket: str, output_prefix: str, count: int
+    ) -> List[Optional[Dict[str, Any]]]:
+        outputs: List[Optional[Dict[str, Any]]] = [None] * count
+
+        def list_output_keys() -> List[str]:
+            paginator = s3.get_paginator("list_objects_v2")
+            return [
+                obj["Key"]
+                for page in paginator.paginate(Bucket=bucket, Prefix=output_prefix)
+                for obj in page.get("Contents", [])
+                if obj["Key"].endswith(".jsonl.out")
+            ]
+
+        def read_object(key: str) -> bytes:
+            return s3.get_object(Bucket=bucket, Key=key)["Body"].read()
+
+        keys = await self.auth.run_in_executor(list_output_keys)
+
+        failed = 0
+        for key in keys:
+            body = await self.auth.run_in_executor(read_object, key)
+            for line in body.splitlines():
+                if not line.strip():
+                    continue
+                record = serialization.loads(line)
+                output = record.get("modelOutput")
+                if output is None:
+                    failed += 1
+                    continue
+                outputs[int(record["recordId"])] = output
+
+        if failed:
+            logger.warning(f"{failed} batch inference records failed and will be retried on demand")
+
+        return outputs
+
+
+class BedrockBatchEmbedder(BedrockBatchJobRunner):
+    """Generate Titan embeddings with a Bedrock model invocation job"""
+
+    JOB_PREFIX = "raganything-embed"
+    error_class = BedrockEmbeddingError
+
+    async def embed_texts(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """Embed texts with a batch inference job
+
+        Returns one embedding per text, or None for records the job failed.
+        """
+        model_id = self.config.titan_embedding_model_id
+        # Same request fields, and so the same dimension, as on-demand embedding
+        options = titan_request_options(model_id)
+        outputs = await self.run_job(
+            model_id,
+            [{"inputText": text[:8000], **options} for text in texts],
+        )
+        return [output.get("embedding") if output else None for output in outputs]
+
+
+class BedrockBatchCompleter(BedrockBatchJobRunner):
+    """Run Claude requests with a Bedrock model invocation job"""
+
+    JOB_PREFIX = "raganything-complete"
+
+    async def complete_requests(
+        self, model_id: str, request_payloads: List[Dict[str, Any]]
+    ) -> List[Optional[Dict[str, Any]]]:
+        """Run prepared Claude request payloads as one batch job
+
+        Returns the Claude response for each payload, or None for records the
+        job failed.
+        """
+        return await self.run_job(model_id, request_payloads)
@@ -2,14 +2,25 @@
 Caching and performance optimization utilities for AWS Bedrock
 """
 
-import json
 import hashlib
 import asyncio
+import bisect
+import heapq
 import time
-from typing import Dict, Any, Optional, List
+from collections import OrderedDict, deque
+from typing import Deque, Dict, Any, Optional, List, Set, Tuple
 from dataclasses import dataclass
 import logging
 
+from . import serialization
+
+try:
+    import xxhash
+
+    XXHASH_AVAILABLE = True
+except ImportError:
+    XXHASH_AVAILABLE = False
+
 
 @dataclass
 class CacheEntry:
@@ -31,44 +42,73 @@ class CacheEntry:
 
 
 class BedrockCache:
-    """In-memory cache for Bedrock responses with TTL and LRU eviction"""
+    """In-memory cache for Bedrock responses with TTL and LRU eviction
+
+    Entries are addressed by ``make_key(request_data)``. Compute the key once
+    per request and pass it to both ``get`` and, on a miss, ``put``, so the
+    request is serialized and hashed only once.
+
+    Expired entries are removed by a background task that the first ``put``
+    made inside a running event loop starts, every ``cleanup_interval``
+    seconds.
+    """
     
-    def __init__(self, max_size: int = 1000, default_ttl: float = 3600):
+    def __init__(self, max_size: int = 1000, default_ttl: float = 3600, cleanup_interval: float = 60.0):
         self.max_size = max_size
         self.default_ttl = default_ttl
-        self.cache: Dict[str, CacheEntry] = {}
-        self.access_order: List[str] = []
+        self.cleanup_interval = cleanup_interval
+        # Ordered from least to most recently used
+        self.cache: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        # Running totals over the current entries, for get_stats
+        self._total_accesses = 0
+        self._accessed_entries = 0
+        # Min-heap of (expiry time, key); entries are checked lazily on pop
+        self._expiry_heap: List[Tuple[float, str]] = []
+        self._cleanup_task: Optional[asyncio.Task] = None
         self.logger = logging.getLogger(__name__)
         
-    def _generate_key(self, data: Dict[str, Any]) -> str:
+    @staticmethod
+    def make_key(data: Dict[str, Any]) -> str:
         """Generate cache key from request data"""
-        # Create a normalized representation for consistent caching
-        cache_data = {
-            k: v for k, v in data.items() 
-            if k not in ['timestamp', 'request_id']
-        }
+        # Keys only need to be well spread, not cryptographic, so use XXH3
+        # when available and BLAKE2b otherwise
+        hasher = xxhash.xxh3_128() if XXHASH_AVAILABLE else hashlib.blake2b(digest_size=16)
+        
+        # Feed fields in sorted order for consistent hashing rather than
+        # serializing the whole request; large prompts are hashed in place
+        for k in sorted(data):
+            if k in ('timestamp', 'request_id'):
+                continue
+            value = data[k]
+            hasher.update(k.encode('utf-8'))
+            if isinstance(value, str):
+                hasher.update(b'\0s')
+                hasher.update(value.encode('utf-8'))
+            else:
+                hasher.update(b'\0j')
+                hasher.update(serialization.dumps(value, sort_keys=True))
+            hasher.update(b'\0')
         
-        # Sort keys for consistent hashing
-        cache_str = json.dumps(cache_data, sort_keys=True, ensure_ascii=False)
-        return hashlib.md5(cache_str.encode()).hexdigest()
+        return hasher.hexdigest()
     
     def get(self, key: str) -> Optional[Any]:
         """Get item from cache"""
-        if key not in self.cache:
+        entry = self.cache.get(key)
+        if entry is None:
             return None
-            
-        entry = self.cache[key]
         
         # Check if expired
         if entry.is_expired():
             self.remove(key)
             return None
         
-        # Update access order for LRU
         entry.access()
-        if key in self.access_order:
-            self.access_order.remove(key)
-        self.access_order.append(key)
+        self._total_accesses += 1
+        if entry.access_count == 1:
+            self._accessed_entries += 1
+        
+        # Update access order for LRU
+        self.cache.move_to_end(key)
         
         return entry.data
     
@@ -85,130 +125,241 @@ class BedrockCache:
             ttl=ttl
         )
         
-        # Add to cache
+        # Add to cache as the most recently used entry
+        self.remove(key)
         self.cache[key] = entry
-        
-        # Update access order
-        if key in self.access_order:
-            self.access_order.remove(key)
-        self.access_order.append(key)
+        if ttl is not None:
+            heapq.heappush(self._expiry_heap, (entry.timestamp + ttl, key))
+            self._compact_expiry_heap()
+            self._ensure_periodic_cleanup()
         
         # Evict if over capacity
         self._evict_if_needed()
     
     def remove(self, key: str) -> None:
         """Remove item from cache"""
-        if key in self.cache:
-            del self.cache[key]
-        if key in self.access_order:
-            self.access_order.remove(key)
+        entry = self.cache.pop(key, None)
+        if entry is not None:
+            self._forget(entry)
+    
+    def _forget(self, entry: CacheEntry) -> None:
+        """Take a removed entry out of the running totals"""
+        self._total_accesses -= entry.access_count
+        if entry.access_count > 0:
+            self._accessed_entries -= 1
     
     def clear(self) -> None:
         """Clear all cache entries"""
         self.cache.clear()
-        self.access_order.clear()
+        self._expiry_heap.clear()
+        self._total_accesses = 0
+        self._accessed_entries = 0
     
     def _evict_if_needed(self) -> None:
         """Evict least recently used items if over capacity"""
         while len(self.cache) > self.max_size:
-            if not self.access_order:
-                break
-                
             # Remove least recently used item
-            lru_key = self.access_order.pop(0)
-            if lru_key in self.cache:
-                del self.cache[lru_key]
+            _, entry = self.cache.popitem(last=False)
+            self._forget(entry)
     
     def cleanup_expired(self) -> int:
-        """Remove expired entries and return count removed"""
-        expired_keys = []
+        """Remove expired entries and return count removed
         
-        for key, entry in self.cache.items():
-            if entry.is_expired():
-                expired_keys.append(key)
+        Only the expired prefix of the expiry heap is visited. Heap items
+        left behind by overwritten or evicted keys are dropped as they
+        surface.
+        """
+        now = time.time()
+        removed = 0
         
-        for key in expired_keys:
-            self.remove(key)
+        while self._expiry_heap and self._expiry_heap[0][0] < now:
+            _, key = heapq.heappop(self._expiry_heap)
+            entry = self.cache.get(key)
+            if entry is not None and entry.is_expired():
+                self.remove(key)
+                removed += 1
+        
+        self._compact_expiry_heap()
             
-        if expired_keys:
-            self.logger.debug(f"Cleaned up {len(expired_keys)} expired cache entries")
+        if removed:
+            self.logger.debug(f"Cleaned up {removed} expired cache entries")
             
-        return len(expired_keys)
+        return removed
+    
+    def _compact_expiry_heap(self) -> None:
+        """Rebuild the expiry heap once stale items outnumber live entries
+        
+        Overwritten and evicted keys leave their heap items behind. The
+        rebuild is O(n) and runs at most once per ``max_size`` puts, so the
+        heap stays bounded at amortized O(1) cost per ``put``.
+        """
+        if len(self._expiry_heap) > 2 * max(len(self.cache), self.max_size):
+            self._expiry_heap = [
+                (entry.timestamp + entry.ttl, key)
+                for key, entry in self.cache.items() if entry.ttl is not None
+            ]
+            heapq.heapify(self._expiry_heap)
+    
+    def _ensure_periodic_cleanup(self) -> None:
+        """Start the background cleanup if a loop is running and it is not active"""
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self.start_periodic_cleanup(self.cleanup_interval)
+    
+    def start_periodic_cleanup(self, interval: Optional[float] = None) -> None:
+        """Run ``cleanup_expired`` every ``interval`` seconds in the background
+        
+        Must be called from a running event loop. A task left on a loop that
+        has since closed is replaced.
+        """
+        if interval is None:
+            interval = self.cleanup_interval
+        loop = asyncio.get_running_loop()
+        task = self._cleanup_task
+        if task is None or task.done() or task.get_loop() is not loop:
+            self._cleanup_task = loop.create_task(self._periodic_cleanup(interval))
+    
+    def stop_periodic_cleanup(self) -> None:
+        """Stop the background cleanup started by ``start_periodic_cleanup``"""
+        if self._cleanup_task is not None:
+            if not self._cleanup_task.get_loop().is_closed():
+                self._cleanup_task.cancel()
+            self._cleanup_task = None
+    
+    async def _periodic_cleanup(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            self.cleanup_expired()
     
     def get_stats(self) -> Dict[str, Any]:
         """Get cache statistics"""
-        total_access_count = sum(entry.access_count for entry in self.cache.values())
-        
         return {
             "size": len(self.cache),
             "max_size": self.max_size,
-            "total_accesses": total_access_count,
-            "hit_rate": 0.0 if total_access_count == 0 else 
-                       sum(1 for entry in self.cache.values() if entry.access_count > 0) / len(self.cache)
+            "total_accesses": self._total_accesses,
+            "hit_rate": 0.0 if self._total_accesses == 0 else
+                       self._accessed_entries / len(self.cache)
         }
 
 
 class BedrockBatchProcessor:
-    """Batch processor for optimizing Bedrock API calls"""
+    """Batch processor for optimizing Bedrock API calls
     
-    def __init__(self, batch_size: int = 10, batch_timeout: float = 1.0):
+    Requests are put on an ``asyncio.Queue`` and a single consumer task
+    assembles them into batches. A batch is dispatched as soon as it reaches
+    ``batch_size``. Partial batches are dispatched after an adaptive delay:
+    when few requests are in flight the delay shrinks towards ``min_delay`` so
+    callers are not kept waiting, and when many are in flight it grows
+    towards ``batch_timeout`` so more requests share a batch.
+    """
+    
+    def __init__(self, batch_size: int = 10, batch_timeout: float = 1.0, min_delay: float = 0.005):
         self.batch_size = batch_size
         self.batch_timeout = batch_timeout
-        self.pending_requests: List[Dict[str, Any]] = []
-        self.batch_futures: List[asyncio.Future] = []
+        self.min_delay = min_delay
         self.logger = logging.getLogger(__name__)
-        self._batch_lock = asyncio.Lock()
+        # The queue and tasks belong to one event loop; they are created on
+        # first use and re-created when called from a different loop
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional["asyncio.Queue[Dict[str, Any]]"] = None
+        # Requests the consumer has taken off the queue but not dispatched
+        self._filling: List[Dict[str, Any]] = []
+        self._consumer_task: Optional[asyncio.Task] = None
+        self._batch_tasks: Set[asyncio.Task] = set()
+        # Requests handed to a processor and not yet completed
+        self._outstanding = 0
         
     async def add_request(self, request_data: Dict[str, Any], processor_func) -> Any:
         """Add request to batch and return future result"""
-        future = asyncio.Future()
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._bind_loop(loop)
+        future = loop.create_future()
         
-        async with self._batch_lock:
-            self.pending_requests.append({
-                'data': request_data,
-                'future': future,
-                'processor': processor_func
-            })
-            
-            # Process batch if full or timeout reached
-            if len(self.pending_requests) >= self.batch_size:
-                await self._process_batch()
+        self._queue.put_nowait({
+            'data': request_data,
+            'future': future,
+            'processor': processor_func
+        })
+        self._ensure_consumer()
         
-        # Set timeout for batch processing
-        try:
-            return await asyncio.wait_for(future, timeout=self.batch_timeout * 2)
-        except asyncio.TimeoutError:
-            # Process remaining batch on timeout
-            async with self._batch_lock:
-                if self.pending_requests:
-                    await self._process_batch()
-            return await future
-    
-    async def _process_batch(self) -> None:
-        """Process current batch of requests"""
-        if not self.pending_requests:
-            return
+        return await future
+    
+    def _bind_loop(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Start fresh on loop; state from a previous loop cannot be awaited"""
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        self._filling = []
+        self._consumer_task = None
+        self._batch_tasks = set()
+        self._outstanding = 0
+    
+    def _ensure_consumer(self) -> None:
+        if self._consumer_task is None or self._consumer_task.done():
+            self._consumer_task = asyncio.create_task(self._consumer())
+    
+    def _drain_queue(self, batch: List[Dict[str, Any]]) -> None:
+        """Move queued requests into batch until it holds ``batch_size``"""
+        while len(batch) < self.batch_size and self._queue is not None and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+    
+    def _flush_delay(self) -> float:
+        """Seconds to let a partial batch fill before dispatching it"""
+        waiting = len(self._filling) + (self._queue.qsize() if self._queue is not None else 0)
+        if waiting == 0:
+            return self.min_delay
+        delay = self.batch_timeout * self._outstanding / waiting
+        return min(self.batch_timeout, max(self.min_delay, delay))
+    
+    def _dispatch(self, batch: List[Dict[str, Any]]) -> None:
+        # Run detached so the consumer keeps assembling the next batch
+        task = asyncio.create_task(self._process_batch(batch))
+        self._batch_tasks.add(task)
+        task.add_done_callback(self._batch_tasks.discard)
+    
+    async def _consumer(self) -> None:
+        """Assemble queued requests into batches and dispatch them"""
+        while True:
+            self._filling.append(await self._queue.get())
+            self._drain_queue(self._filling)
             
-        batch = self.pending_requests.copy()
-        self.pending_requests.clear()
+            if len(self._filling) < self.batch_size:
+                await asyncio.sleep(self._flush_delay())
+                self._drain_queue(self._filling)
+            
+            # flush() may have taken the batch while we slept
+            batch, self._filling = self._filling, []
+            if batch:
+                self._dispatch(batch)
+    
+    async def _process_batch(self, batch: List[Dict[str, Any]]) -> None:
+        """Process a batch of requests"""
+        if not batch:
+            return
         
         self.logger.debug(f"Processing batch of {len(batch)} requests")
+        self._outstanding += len(batch)
         
-        # Group requests by processor type
-        processor_groups = {}
-        for request in batch:
-            processor = request['processor']
-            if processor not in processor_groups:
-                processor_groups[processor] = []
-            processor_groups[processor].append(request)
-        
-        # Process each group concurrently
-        tasks = []
-        for processor, requests in processor_groups.items():
-            task = asyncio.create_task(self._process_group(processor, requests))
-            tasks.append(task)
-        
-        await asyncio.gather(*tasks, return_exceptions=True)
+        try:
+            # Group requests by processor type
+            processor_groups = {}
+            for request in batch:
+                processor = request['processor']
+                if processor not in processor_groups:
+                    processor_groups[processor] = []
+                processor_groups[processor].append(request)
+            
+            # Process each group concurrently
+            tasks = []
+            for processor, requests in processor_groups.items():
+                task = asyncio.create_task(self._process_group(processor, requests))
+                tasks.append(task)
+            
+            await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            self._outstanding -= len(batch)
     
     async def _process_group(self, processor_func, requests: List[Dict[str, Any]]) -> None:
         """Process a group of requests with the same processor"""
@@ -236,9 +387,29 @@ class BedrockBatchProcessor:
     
     async def flush(self) -> None:
         """Process any remaining requests in batch"""
-        async with self._batch_lock:
-            if self.pending_requests:
-                await self._process_batch()
+        if self._loop is not asyncio.get_running_loop():
+            # Nothing was queued on this loop
+            return
+        batch, self._filling = self._filling, []
+        while True:
+            self._drain_queue(batch)
+            if not batch:
+                break
+            self._dispatch(batch)
+            batch = []
+        if self._batch_tasks:
+            await asyncio.gather(*self._batch_tasks, return_exceptions=True)
+    
+    async def close(self) -> None:
+        """Flush remaining requests and stop the consumer"""
+        await self.flush()
+        if self._consumer_task is not None and self._loop is asyncio.get_running_loop():
+            self._consumer_task.cancel()
+            try:
+                await self._consumer_task
+            except asyncio.CancelledError:
+                pass
+            self._consumer_task = None
 
 
 class BedrockRateLimiter:
@@ -247,30 +418,89 @@ class BedrockRateLimiter:
     def __init__(self, requests_per_second: float = 10.0, burst_size: int = 20):
         self.requests_per_second = requests_per_second
         self.burst_size = burst_size
-        self.tokens = burst_size
-        self.last_update = time.time()
+        self.tokens = float(burst_size)
+        self.last_update = time.monotonic()
+        # Only held by callers that have to wait for a token
         self.lock = asyncio.Lock()
+    
+    def _refill(self) -> None:
+        now = time.monotonic()
+        elapsed = now - self.last_update
+        self.last_update = now
+        self.tokens = min(
+            self.burst_size,
+            self.tokens + elapsed * self.requests_per_second
+        )
         
     async def acquire(self) -> None:
         """Acquire permission to make a request"""
-        async with self.lock:
-            now = time.time()
-            
-            # Add tokens based on time elapsed
-            elapsed = now - self.last_update
-            self.tokens = min(
-                self.burst_size,
-                self.tokens + elapsed * self.requests_per_second
-            )
-            self.last_update = now
-            
-            # Wait if no tokens available
-            if self.tokens < 1:
-                wait_time = (1 - self.tokens) / self.requests_per_second
-                await asyncio.sleep(wait_time)
-                self.tokens = 0
-            else:
+        # Fast path: nothing awaits between the check and the decrement, so
+        # it cannot interleave with other coroutines. Skipped while callers
+        # are queued on the lock so they are served first.
+        if not self.lock.locked():
+            self._refill()
+            if self.tokens >= 1:
                 self.tokens -= 1
+                return
+        
+        async with self.lock:
+            while True:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.requests_per_second)
+
+
+class BedrockTokenBucket:
+    """Rate limiter for Bedrock API calls on both token and request quotas
+
+    Bedrock throttles on tokens-per-minute as well as requests-per-minute,
+    so callers reserve the estimated token cost of a call before making it.
+    """
+
+    def __init__(self, tokens_per_minute: float = 200000.0, requests_per_minute: float = 200.0):
+        self.tokens_per_minute = tokens_per_minute
+        self.requests_per_minute = requests_per_minute
+        self.token_capacity = tokens_per_minute
+        self.request_capacity = requests_per_minute
+        self.last_update = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    @staticmethod
+    def estimate_tokens(text: str) -> int:
+        """Roughly estimate the token count of text (about 4 characters per token)"""
+        return max(1, len(text) // 4)
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        elapsed = now - self.last_update
+        self.last_update = now
+        self.token_capacity = min(
+            self.tokens_per_minute,
+            self.token_capacity + elapsed * self.tokens_per_minute / 60.0
+        )
+        self.request_capacity = min(
+            self.requests_per_minute,
+            self.request_capacity + elapsed * self.requests_per_minute / 60.0
+        )
+
+    async def acquire(self, tokens: int = 1) -> None:
+        """Wait until the request and its estimated tokens fit within the quotas"""
+        # A single call larger than the whole bucket could never be admitted
+        tokens = min(tokens, self.tokens_per_minute)
+
+        async with self.lock:
+            while True:
+                self._refill()
+                if self.token_capacity >= tokens and self.request_capacity >= 1:
+                    self.token_capacity -= tokens
+                    self.request_capacity -= 1
+                    return
+
+                token_wait = max(0.0, tokens - self.token_capacity) * 60.0 / self.tokens_per_minute
+                request_wait = max(0.0, 1 - self.request_capacity) * 60.0 / self.requests_per_minute
+                await asyncio.sleep(max(token_wait, request_wait))
 
 
 class BedrockPerformanceMonitor:
@@ -286,8 +516,10 @@ class BedrockPerformanceMonitor:
             'cache_misses': 0,
             'rate_limit_hits': 0,
         }
-        self.request_times: List[float] = []
         self.max_history = 1000
+        self.request_times: Deque[float] = deque(maxlen=self.max_history)
+        # The same window kept in sorted order, so percentiles are a lookup
+        self._sorted_times: List[float] = []
         
     def record_request(self, success: bool, response_time: float, cached: bool = False):
         """Record a request metric"""
@@ -306,9 +538,12 @@ class BedrockPerformanceMonitor:
             self.metrics['cache_misses'] += 1
             
         # Keep recent response times for percentile calculations
+        if len(self.request_times) == self.request_times.maxlen:
+            # The append below drops the oldest time from the window
+            oldest = self.request_times[0]
+            del self._sorted_times[bisect.bisect_left(self._sorted_times, oldest)]
         self.request_times.append(response_time)
-        if len(self.request_times) > self.max_history:
-            self.request_times.pop(0)
+        bisect.insort(self._sorted_times, response_time)
     
     def record_rate_limit(self):
         """Record a rate limit hit"""
@@ -329,8 +564,8 @@ class BedrockPerformanceMonitor:
         })
         
         # Add percentiles if we have request times
-        if self.request_times:
-            sorted_times = sorted(self.request_times)
+        if self._sorted_times:
+            sorted_times = self._sorted_times
             stats.update({
                 'p50_response_time': self._percentile(sorted_times, 0.5),
                 'p95_response_time': self._percentile(sorted_times, 0.95),
@@ -354,4 +589,5 @@ class BedrockPerformanceMonitor:
         """Reset all metrics"""
         self.metrics = {key: 0 if isinstance(value, (int, float)) else value 
                        for key, value in self.metrics.items()}
-        self.request_times.clear()
\ No newline at end of file
+        self.request_times.clear()
+        self._sorted_times.clear()
\ No newline at end of file
@@ -2,9 +2,11 @@
 AWS Bedrock configuration management
 """
 
+import copy
+import functools
 import os
 from dataclasses import dataclass, field
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from .exceptions import BedrockConfigurationError
 
 # Import compatibility layer
@@ -29,6 +31,19 @@ class RetryConfig:
     ])
 
 
+def _env_snapshot() -> Tuple[Tuple[str, str], ...]:
+    """Return the environment variables BedrockConfig reads, as a hashable key"""
+    return tuple(sorted(
+        (name, value) for name, value in os.environ.items()
+        if name.startswith(("AWS_", "BEDROCK_"))
+    ))
+
+
+@functools.lru_cache(maxsize=8)
+def _config_from_env(cls: type, snapshot: Tuple[Tuple[str, str], ...]) -> 'BedrockConfig':
+    return cls()
+
+
 @dataclass
 class BedrockConfig:
     """Configuration class for AWS Bedrock integration"""
@@ -60,6 +75,11 @@ class BedrockConfig:
     top_p: float = field(default_factory=lambda: get_env_value("BEDROCK_TOP_P", 0.9, float))
     top_k: int = field(default_factory=lambda: get_env_value("BEDROCK_TOP_K", 250, int))
     
+    # Prompt Caching Configuration (requires a Claude model with prompt caching support)
+    prompt_caching_enabled: bool = field(default_factory=lambda: get_env_value("BEDROCK_PROMPT_CACHING_ENABLED", False, bool))
+    # "short" keeps cache checkpoints for 5 minutes, "long" for 1 hour
+    prompt_cache_retention: str = field(default_factory=lambda: get_env_value("BEDROCK_PROMPT_CACHE_RETENTION", "short", str))
+    
     # Retry Configuration
     retry_max_attempts: int = field(default_factory=lambda: get_env_value("BEDROCK_RETRY_MAX_ATTEMPTS", 3, int))
     retry_backoff_factor: float = field(default_factory=lambda: get_env_value("BEDROCK_RETRY_BACKOFF_FACTOR", 2.0, float))
@@ -67,76 +87,107 @@ class BedrockConfig:
     
     # Request Configuration
     request_timeout: int = field(default_factory=lambda: get_env_value("BEDROCK_REQUEST_TIMEOUT", 300, int))
+    # Also sizes the shared HTTP connection pool, so set it to the expected
+    # number of concurrent Claude/Titan calls
     max_concurrent_requests: int = field(default_factory=lambda: get_env_value("BEDROCK_MAX_CONCURRENT_REQUESTS", 10, int))
+    # Claude requests per second across the provider; unset means no limit
+    # beyond max_concurrent_requests
+    requests_per_second: Optional[float] = field(default_factory=lambda: get_env_value("BEDROCK_REQUESTS_PER_SECOND", None, float))
     
     # Embedding Configuration
     embedding_batch_size: int = field(default_factory=lambda: get_env_value("BEDROCK_EMBEDDING_BATCH_SIZE", 25, int))
     embedding_dimensions: Optional[int] = field(default_factory=lambda: get_env_value("BEDROCK_EMBEDDING_DIMENSIONS", None, int))
+    embedding_cache_enabled: bool = field(default_factory=lambda: get_env_value("BEDROCK_EMBEDDING_CACHE_ENABLED", False, bool))
+    
+    # Batch Inference Configuration (offline ingestion through S3)
+    batch_inference_s3_uri: Optional[str] = field(default_factory=lambda: get_env_value("BEDROCK_BATCH_INFERENCE_S3_URI", None, str))
+    batch_inference_role_arn: Optional[str] = field(default_factory=lambda: get_env_value("BEDROCK_BATCH_INFERENCE_ROLE_ARN", None, str))
+    batch_inference_poll_interval: float = field(default_factory=lambda: get_env_value("BEDROCK_BATCH_INFERENCE_POLL_INTERVAL", 60.0, float))
+    # complete_batch calls with at least this many distinct prompts run as a
+    # batch inference job; unset keeps them on demand
+    batch_job_threshold: Optional[int] = field(default_factory=lambda: get_env_value("BEDROCK_BATCH_JOB_THRESHOLD", None, int))
     
     # Vision Configuration
     max_image_size: int = field(default_factory=lambda: get_env_value("BEDROCK_MAX_IMAGE_SIZE", 1024, int))
     image_quality: str = field(default_factory=lambda: get_env_value("BEDROCK_IMAGE_QUALITY", "standard", str))
     
+    # Semantic Cache Configuration
+    semantic_cache_enabled: bool = field(default_factory=lambda: get_env_value("BEDROCK_SEMANTIC_CACHE_ENABLED", False, bool))
+    semantic_cache_threshold: float = field(default_factory=lambda: get_env_value("BEDROCK_SEMANTIC_CACHE_THRESHOLD", 0.95, float))
+    semantic_cache_ttl: float = field(default_factory=lambda: get_env_value("BEDROCK_SEMANTIC_CACHE_TTL", 3600.0, float))
+    semantic_cache_max_entries: int = field(default_factory=lambda: get_env_value("BEDROCK_SEMANTIC_CACHE_MAX_ENTRIES", 1000, int))
+    
+    # Response Cache Configuration (exact-match cache for stateless Claude completions)
+    response_cache_enabled: bool = field(default_factory=lambda: get_env_value("BEDROCK_RESPONSE_CACHE_ENABLED", False, bool))
+    response_cache_ttl: float = field(default_factory=lambda: get_env_value("BEDROCK_RESPONSE_CACHE_TTL", 300.0, float))
+    response_cache_max_entries: int = field(default_factory=lambda: get_env_value("BEDROCK_RESPONSE_CACHE_MAX_ENTRIES", 1000, int))
+    
+    # Query Validation Configuration (answer conversational queries without retrieval)
+    query_validation_enabled: bool = field(default_factory=lambda: get_env_value("BEDROCK_QUERY_VALIDATION_ENABLED", True, bool))
+    
     def __post_init__(self):
         """Post-initialization validation"""
         self.validate()
     
     @classmethod
     def from_env(cls) -> 'BedrockConfig':
-        """Create configuration from environment variables"""
-        return cls()
+        """Create configuration from environment variables
+        
+        The environment is read and validated once per distinct set of
+        ``AWS_*``/``BEDROCK_*`` variables; each call returns its own copy.
+        """
+        return copy.copy(_config_from_env(cls, _env_snapshot()))
+    
+    # (check, message) pairs; a check returning False adds its message
+    _VALIDATION_RULES = (
+        # AWS region
+        (lambda c: bool(c.aws_region), "AWS region is required"),
+        # Model IDs
+        (lambda c: bool(c.claude_model_id), "Claude model ID is required"),
+        (lambda c: bool(c.claude_haiku_model_id), "Claude Haiku model ID is required"),
+        (lambda c: bool(c.titan_embedding_model_id), "Titan embedding model ID is required"),
+        # Numeric parameters
+        (lambda c: c.max_tokens > 0, "max_tokens must be positive"),
+        (lambda c: 0.0 <= c.temperature <= 2.0, "temperature must be between 0.0 and 2.0"),
+        (lambda c: 0.0 <= c.top_p <= 1.0, "top_p must be between 0.0 and 1.0"),
+        (lambda c: c.top_k > 0, "top_k must be positive"),
+        (lambda c: c.prompt_cache_retention in ("short", "long"),
+         "prompt_cache_retention must be 'short' or 'long'"),
+        # Retry configuration
+        (lambda c: c.retry_max_attempts > 0, "retry_max_attempts must be positive"),
+        (lambda c: c.retry_backoff_factor > 1.0, "retry_backoff_factor must be greater than 1.0"),
+        (lambda c: c.retry_max_backoff > 0, "retry_max_backoff must be positive"),
+        # Request configuration
+        (lambda c: c.request_timeout > 0, "request_timeout must be positive"),
+        (lambda c: c.max_concurrent_requests > 0, "max_concurrent_requests must be positive"),
+        (lambda c: c.requests_per_second is None or c.requests_per_second > 0,
+         "requests_per_second must be positive if specified"),
+        # Embedding configuration
+        (lambda c: c.embedding_batch_size > 0, "embedding_batch_size must be positive"),
+        (lambda c: c.embedding_dimensions is None or c.embedding_dimensions > 0,
+         "embedding_dimensions must be positive if specified"),
+        # Batch inference configuration
+        (lambda c: not c.batch_inference_s3_uri or c.batch_inference_s3_uri.startswith("s3://"),
+         "batch_inference_s3_uri must be an s3:// URI"),
+        (lambda c: c.batch_inference_poll_interval > 0, "batch_inference_poll_interval must be positive"),
+        (lambda c: c.batch_job_threshold is None or c.batch_job_threshold > 0,
+         "batch_job_threshold must be positive if specified"),
+        # Vision configuration
+        (lambda c: c.max_image_size > 0, "max_image_size must be positive"),
+        (lambda c: c.image_quality in ("standard", "high"), "image_quality must be 'standard' or 'high'"),
+        # Semantic cache configuration
+        (lambda c: 0.0 < c.semantic_cache_threshold <= 1.0,
+         "semantic_cache_threshold must be between 0.0 and 1.0"),
+        (lambda c: c.semantic_cache_ttl > 0, "semantic_cache_ttl must be positive"),
+        (lambda c: c.semantic_cache_max_entries > 0, "semantic_cache_max_entries must be positive"),
+        # Response cache configuration
+        (lambda c: c.response_cache_ttl > 0, "response_cache_ttl must be positive"),
+        (lambda c: c.response_cache_max_entries > 0, "response_cache_max_entries must be positive"),
+    )
     
     def validate(self) -> bool:
         """Validate configuration settings"""
-        errors = []
-        
-        # Validate AWS region
-        if not self.aws_region:
-            errors.append("AWS region is required")
-        
-        # Validate model IDs
-        if not self.claude_model_id:
-            errors.append("Claude model ID is required")
-        if not self.claude_haiku_model_id:
-            errors.append("Claude Haiku model ID is required")
-        if not self.titan_embedding_model_id:
-            errors.append("Titan embedding model ID is required")
-        
-        # Validate numeric parameters
-        if self.max_tokens <= 0:
-            errors.append("max_tokens must be positive")
-        if not 0.0 <= self.temperature <= 2.0:
-            errors.append("temperature must be between 0.0 and 2.0")
-        if not 0.0 <= self.top_p <= 1.0:
-            errors.append("top_p must be between 0.0 and 1.0")
-        if self.top_k <= 0:
-            errors.append("top_k must be positive")
-        
-        # Validate retry configuration
-        if self.retry_max_attempts <= 0:
-            errors.append("retry_max_attempts must be positive")
-        if self.retry_backoff_factor <= 1.0:
-            errors.append("retry_backoff_factor must be greater than 1.0")
-        if self.retry_max_backoff <= 0:
-            errors.append("retry_max_backoff must be positive")
-        
-        # Validate request configuration
-        if self.request_timeout <= 0:
-            errors.append("request_timeout must be positive")
-        if self.max_concurrent_requests <= 0:
-            errors.append("max_concurrent_requests must be positive")
-        
-        # Validate embedding configuration
-        if self.embedding_batch_size <= 0:
-            errors.append("embedding_batch_size must be positive")
-        if self.embedding_dimensions is not None and self.embedding_dimensions <= 0:
-            errors.append("embedding_dimensions must be positive if specified")
-        
-        # Validate vision configuration
-        if self.max_image_size <= 0:
-            errors.append("max_image_size must be positive")
-        if self.image_quality not in ["standard", "high"]:
-            errors.append("image_quality must be 'standard' or 'high'")
+        errors = [message for check, message in self._VALIDATION_RULES if not check(self)]
         
         if errors:
             raise BedrockConfigurationError(f"Configuration validation failed: {'; '.join(errors)}")
@@ -163,13 +214,29 @@ class BedrockConfig:
             "temperature": self.temperature,
             "top_p": self.top_p,
             "top_k": self.top_k,
+            "prompt_caching_enabled": self.prompt_caching_enabled,
+            "prompt_cache_retention": self.prompt_cache_retention,
             "retry_max_attempts": self.retry_max_attempts,
             "retry_backoff_factor": self.retry_backoff_factor,
             "retry_max_backoff": self.retry_max_backoff,
             "request_timeout": self.request_timeout,
             "max_concurrent_requests": self.max_concurrent_requests,
+            "requests_per_second": self.requests_per_second,
             "embedding_batch_size": self.embedding_batch_size,
             "embedding_dimensions": self.embedding_dimensions,
+            "embedding_cache_enabled": self.embedding_cache_enabled,
+            "batch_inference_s3_uri": self.batch_inference_s3_uri,
+            "batch_inference_role_arn": self.batch_inference_role_arn,
+            "batch_inference_poll_interval": self.batch_inference_poll_interval,
+            "batch_job_threshold": self.batch_job_threshold,
             "max_image_size": self.max_image_size,
             "image_quality": self.image_quality,
+            "semantic_cache_enabled": self.semantic_cache_enabled,
+            "semantic_cache_threshold": self.semantic_cache_threshold,
+            "semantic_cache_ttl": self.semantic_cache_ttl,
+            "semantic_cache_max_entries": self.semantic_cache_max_entries,
+            "response_cache_enabled": self.response_cache_enabled,
+            "response_cache_ttl": self.response_cache_ttl,
+            "response_cache_max_entries": self.response_cache_max_entries,
+            "query_validation_enabled": self.query_validation_enabled,
         }
\ No newline at end of file
@@ -0,0 +1,273 @@
+"""
+Persistent on-disk cache for AWS Bedrock embeddings
+"""
+
+import os
+import hashlib
+import difflib
+import logging
+from collections import Counter, deque
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+
+class DiskEmbeddingCache:
+    """Cache embeddings on disk keyed by the SHA-256 of model ID and text
+
+    Each embedding is stored as a float16 ``.npy`` file, half the size of
+    float32 with negligible effect on cosine similarity for normalized Titan
+    vectors, so a hit is a small local file read instead of a Titan
+    round-trip.
+
+    Fuzzy matching is opt-in: with ``fuzzy_threshold`` set, an exact miss
+    compares recently seen texts for the same model with ``difflib`` and
+    reuses an embedding when the texts are nearly identical. A one-character
+    edit can change the meaning of a text, and the comparison costs far more
+    than a hash lookup, so it is off by default.
+
+    ``compact()`` merges the per-entry files into a single float16 matrix that
+    is memory-mapped on load, so opening a large cache costs two file opens
+    instead of one per embedding.
+    """
+
+    PACKED_FILE = "packed.npy"
+    PACKED_KEYS_FILE = "packed_keys.npy"
+
+    def __init__(
+        self,
+        cache_dir: Union[str, Path],
+        fuzzy_threshold: Optional[float] = None,
+        fuzzy_window: int = 128,
+    ):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.fuzzy_threshold = fuzzy_threshold
+        # Texts are only kept for comparison when fuzzy matching is enabled
+        self._recent = deque(maxlen=fuzzy_window if fuzzy_threshold is not None else 0)
+        self.hits = 0
+        self.fuzzy_hits = 0
+        self.misses = 0
+
+        self._packed: Optional[np.ndarray] = None
+        self._packed_index: Dict[str, int] = {}
+        self._load_packed()
+
+    @staticmethod
+    def make_key(model_id: str, text: str) -> str:
+        """Return the cache key for a model ID and text"""
+        return hashlib.sha256(f"{model_id}|{text}".encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.npy"
+
+    def _load_packed(self) -> None:
+        """Memory-map the packed matrix written by ``compact()``, if any"""
+        self._packed = None
+        self._packed_index = {}
+
+        packed_path = self.cache_dir / self.PACKED_FILE
+        keys_path = self.cache_dir / self.PACKED_KEYS_FILE
+        if not packed_path.exists() or not keys_path.exists():
+            return
+
+        try:
+            packed = np.load(packed_path, mmap_mode="r")
+            keys = np.load(keys_path).tolist()
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable packed embedding cache in {self.cache_dir}: {e}")
+            return
+        if packed.ndim != 2 or packed.shape[0] != len(keys):
+            logger.warning(f"Ignoring inconsistent packed embedding cache in {self.cache_dir}")
+            return
+
+        self._packed = packed
+        self._packed_index = {key: row for row, key in enumerate(keys)}
+
+    def _read(self, key: str) -> Optional[np.ndarray]:
+        row = self._packed_index.get(key)
+        if row is not None:
+            return np.asarray(self._packed[row], dtype=np.float32)
+
+        path = self._path(key)
+        if not path.exists():
+            return None
+        try:
+            # Entries written before float16 storage are float32; both load the same way
+            return np.load(path).astype(np.float32)
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable embedding cache entry {path}: {e}")
+            return None
+
+    def _fuzzy_lookup(self, model_id: str, text: str) -> Optional[np.ndarray]:
+        """Reuse the embedding of a recently seen, nearly identical text"""
+        if self.fuzzy_threshold is None:
+            return None
+
+        matcher = difflib.SequenceMatcher(autojunk=False)
+        matcher.set_seq2(text)
+        for recent_model_id, recent_text, key in reversed(self._recent):
+            if recent_model_id != model_id:
+                continue
+            matcher.set_seq1(recent_text)
+            if (
+                matcher.real_quick_ratio() >= self.fuzzy_threshold
+                and matcher.quick_ratio() >= self.fuzzy_threshold
+                and matcher.ratio() >= self.fuzzy_threshold
+            ):
+                return self._read(key)
+        return None
+
+    def contains(self, model_id: str, text: str) -> bool:
+        """Return True if an exact entry for text is on disk, without loading it"""
+        key = self.make_key(model_id, text)
+        return key in self._packed_index or self._path(key).exists()
+
+    def get(self, model_id: str, text: str) -> Optional[np.ndarray]:
+        """Return the cached float32 embedding for text, or None on a miss"""
+        key = self.make_key(model_id, text)
+        embedding = self._read(key)
+        if embedding is not None:
+            self.hits += 1
+            self._recent.append((model_id, text, key))
+            return embedding
+
+        embedding = self._fuzzy_lookup(model_id, text)
+        if embedding is not None:
+            self.fuzzy_hits += 1
+            return embedding
+
+        self.misses += 1
+        return None
+
+    def get_many(self, model_id: str, texts: Sequence[str]) -> List[Optional[np.ndarray]]:
+        """Return the cached embedding for each text, or None for misses
+
+        This reads one file per loose entry, so async callers should run it
+        in a worker thread.
+        """
+        return [self.get(model_id, text) for text in texts]
+
+    def put(self, model_id: str, text: str, embedding: Sequence[float]) -> None:
+        """Store the embedding for text"""
+        self.put_many(model_id, [text], [embedding])
+
+    def put_many(
+        self, model_id: str, texts: Sequence[str], embeddings: Sequence[Sequence[float]]
+    ) -> None:
+        """Store the embeddings for texts
+
+        This writes one file per new entry, so async callers should run it in
+        a worker thread.
+        """
+        for text, embedding in zip(texts, embeddings):
+            key = self.make_key(model_id, text)
+            if key not in self._packed_index:
+                path = self._path(key)
+                path.parent.mkdir(parents=True, exist_ok=True)
+
+                tmp_path = path.with_name(path.name + ".tmp")
+                with open(tmp_path, "wb") as f:
+                    np.save(f, np.asarray(embedding, dtype=np.float16))
+                os.replace(tmp_path, path)
+
+            self._recent.append((model_id, text, key))
+
+    def compact(self) -> int:
+        """Merge per-entry files into the packed matrix and return count merged
+
+        Entries whose dimension differs from the packed matrix are left as
+        individual files.
+        """
+        loose = list(self.cache_dir.glob("*/*.npy"))
+        if not loose:
+            return 0
+
+        merged_paths: List[Path] = []
+        candidates = []
+        for path in loose:
+            if path.stem in self._packed_index:
+                merged_paths.append(path)
+                continue
+            try:
+                row = np.load(path)
+            except Exception as e:
+                logger.warning(f"Skipping unreadable embedding cache entry {path}: {e}")
+                continue
+            if row.ndim == 1:
+                candidates.append((path, row))
+
+        if self._packed is not None:
+            dimension = self._packed.shape[1]
+        elif candidates:
+            dimension = Counter(row.shape[0] for _, row in candidates).most_common(1)[0][0]
+        else:
+            dimension = None
+
+        keys: List[str] = []
+        rows: List[np.ndarray] = []
+        for path, row in candidates:
+            if row.shape[0] == dimension:
+                keys.append(path.stem)
+                rows.append(row)
+                merged_paths.append(path)
+
+        if rows:
+            packed_count = len(self._packed_index)
+            all_keys = list(self._packed_index) + keys
+
+            packed_path = self.cache_dir / self.PACKED_FILE
+            keys_path = self.cache_dir / self.PACKED_KEYS_FILE
+            tmp_packed = packed_path.with_name(packed_path.name + ".tmp")
+            tmp_keys = keys_path.with_name(keys_path.name + ".tmp")
+
+            out = np.lib.format.open_memmap(
+                tmp_packed, mode="w+", dtype=np.float16, shape=(len(all_keys), dimension)
+            )
+            if packed_count:
+                out[:packed_count] = self._packed
+            out[packed_count:] = np.stack(rows)
+            out.flush()
+            del out
+            with open(tmp_keys, "wb") as f:
+                np.save(f, np.array(all_keys, dtype=np.str_))
+
+            # Release the old mapping before replacing the file underneath it
+            self._packed = None
+            os.replace(tmp_keys, keys_path)
+            os.replace(tmp_packed, packed_path)
+            self._load_packed()
+            logger.info(f"Packed {len(rows)} embeddings into {packed_path}")
+
+        for path in merged_paths:
+            path.unlink(missing_ok=True)
+
+        return len(rows)
+
+    def clear(self) -> int:
+        """Remove all cached embeddings and return count removed"""
+        removed = len(self._packed_index)
+        self._packed = None
+        self._packed_index = {}
+        for name in (self.PACKED_FILE, self.PACKED_KEYS_FILE):
+            (self.cache_dir / name).unlink(missing_ok=True)
+
+        for path in self.cache_dir.glob("*/*.npy"):
+            path.unlink()
+            removed += 1
+        self._recent.clear()
+        return removed
+
+    def get_stats(self) -> dict:
+        """Get cache statistics"""
+        total = self.hits + self.fuzzy_hits + self.misses
+        return {
+            "hits": self.hits,
+            "fuzzy_hits": self.fuzzy_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.fuzzy_hits) / total if total > 0 else 0,
+        }
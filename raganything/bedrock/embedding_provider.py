@@ -2,115 +2,246 @@
 AWS Bedrock embedding provider for Amazon Titan models
 """
 
-import json
 import asyncio
+import hashlib
 import logging
 import time
-from typing import List, Optional, Dict, Any
+from collections import OrderedDict
+from typing import Any, List, Optional, Dict, Sequence
+
+import numpy as np
 from botocore.exceptions import ClientError
 
 from .config import BedrockConfig
 from .auth import BedrockAuthenticator
 from .exceptions import BedrockEmbeddingError, BedrockRateLimitError
 from .retry_handler import BedrockRetryHandler
+from . import serialization
+from .embedding_cache import DiskEmbeddingCache
+
+
+def titan_embedding_dimension(model_id: str) -> int:
+    """Return the embedding dimension of a Titan model"""
+    # Titan Text Embeddings V2 returns 1024 dimensions, other Titan models 1536
+    return 1024 if "titan-embed-text-v2" in model_id else 1536
+
+
+def titan_request_options(model_id: str) -> Dict[str, Any]:
+    """Return the request fields besides inputText for a Titan model
+    
+    Only Titan Text Embeddings V2 accepts ``dimensions`` and ``normalize``.
+    """
+    if "titan-embed-text-v2" in model_id:
+        return {"dimensions": titan_embedding_dimension(model_id), "normalize": True}
+    return {}
 
 
 class BedrockEmbeddingProvider:
     """Generate text embeddings using Amazon Titan models"""
     
+    # Number of recent embeddings kept in memory, keyed by content hash
+    SEEN_EMBEDDINGS_MAX = 10000
+    
     def __init__(self, config: BedrockConfig, authenticator: BedrockAuthenticator):
         self.config = config
         self.auth = authenticator
         self.logger = logging.getLogger(__name__)
-        self.retry_handler = BedrockRetryHandler(config.retry_config)
-        self._embedding_dimension = None
+        self.retry_handler = BedrockRetryHandler(config.get_retry_config())
+        self._semaphore = asyncio.Semaphore(config.max_concurrent_requests)
+        self.embedding_dimension = titan_embedding_dimension(config.titan_embedding_model_id)
+        self.embedding_cache: Optional[DiskEmbeddingCache] = None
+        self._seen_embeddings: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        # Everything in the request body after inputText, which never changes
+        options = titan_request_options(config.titan_embedding_model_id)
+        self._request_suffix = b',' + serialization.dumps(options)[1:] if options else b'}'
         
     async def embed_texts(
         self,
         texts: List[str],
-        batch_size: int = 25
-    ) -> List[List[float]]:
-        """Generate embeddings for multiple texts"""
+        batch_size: Optional[int] = None
+    ) -> np.ndarray:
+        """Generate embeddings for multiple texts
+        
+        Returns:
+            np.ndarray: float32 array of shape (len(texts), dimension)
+        """
+        dimension = self.embedding_dimension
+        all_embeddings = np.zeros((len(texts), dimension), dtype=np.float32)
         if not texts:
-            return []
+            return all_embeddings
+        
+        if batch_size is None:
+            batch_size = self.config.embedding_batch_size
+            
+        model_id = self.config.titan_embedding_model_id
+        digests = [hashlib.sha256(text.encode("utf-8")).digest() for text in texts]
+        
+        # Reuse embeddings for content seen earlier in this process, then
+        # serve what we can from the on-disk cache and only embed the rest.
+        # Identical texts within the call are embedded once.
+        pending: Dict[bytes, List[int]] = {}
+        for index, digest in enumerate(digests):
+            embedding = self._seen_embeddings.get(digest)
+            if embedding is None:
+                pending.setdefault(digest, []).append(index)
+            else:
+                self._seen_embeddings.move_to_end(digest)
+                all_embeddings[index] = embedding
+        
+        if pending and self.embedding_cache is not None:
+            # One pass over the disk cache in a worker thread for all misses
+            lookups = list(pending.items())
+            cached = await asyncio.to_thread(
+                self.embedding_cache.get_many, model_id, [texts[indices[0]] for _, indices in lookups]
+            )
+            for (digest, indices), embedding in zip(lookups, cached):
+                if embedding is not None and embedding.shape == (dimension,):
+                    self._remember(digest, embedding)
+                    all_embeddings[indices] = embedding
+                    del pending[digest]
+        
+        if not pending:
+            return all_embeddings
             
-        self.logger.info(f"Generating embeddings for {len(texts)} texts")
+        self.logger.info(f"Generating embeddings for {len(pending)} texts")
         
-        # Process in batches to respect API limits
-        all_embeddings = []
-        for i in range(0, len(texts), batch_size):
-            batch = texts[i:i + batch_size]
+        unique = list(pending.items())
+        # New embeddings for the disk cache, written together after the batches
+        new_texts: List[str] = []
+        new_embeddings: List[np.ndarray] = []
+        
+        async def run_batch(batch_items) -> None:
+            batch = [texts[indices[0]] for _, indices in batch_items]
             batch_embeddings = await self._process_batch(batch)
-            all_embeddings.extend(batch_embeddings)
             
-            # Add small delay between batches to avoid rate limits
-            if i + batch_size < len(texts):
-                await asyncio.sleep(0.1)
+            for (digest, indices), text, embedding in zip(batch_items, batch, batch_embeddings):
+                all_embeddings[indices] = embedding
+                # Zero vectors are failure fallbacks and must not be cached
+                if embedding.any():
+                    self._remember(digest, embedding)
+                    new_texts.append(text)
+                    new_embeddings.append(embedding)
+        
+        # Batches run concurrently; the provider semaphore bounds in-flight
+        # requests and throttling is absorbed by the retry handler
+        await asyncio.gather(*(
+            run_batch(unique[i:i + batch_size])
+            for i in range(0, len(unique), batch_size)
+        ))
+        
+        if self.embedding_cache is not None and new_texts:
+            try:
+                await asyncio.to_thread(
+                    self.embedding_cache.put_many, model_id, new_texts, new_embeddings
+                )
+            except Exception as e:
+                self.logger.warning(f"Failed to write {len(new_texts)} embeddings to the disk cache: {e}")
                 
         return all_embeddings
     
-    async def embed_single(self, text: str) -> List[float]:
+    def find_uncached_texts(self, texts: List[str]) -> List[str]:
+        """Return the unique texts that have no cached embedding yet"""
+        model_id = self.config.titan_embedding_model_id
+        uncached = []
+        for text in dict.fromkeys(texts):
+            if hashlib.sha256(text.encode("utf-8")).digest() in self._seen_embeddings:
+                continue
+            if self.embedding_cache is not None and self.embedding_cache.contains(model_id, text):
+                continue
+            uncached.append(text)
+        return uncached
+    
+    def seed(self, texts: List[str], embeddings: Sequence[Optional[Sequence[float]]]) -> int:
+        """Add precomputed embeddings to the caches and return count added
+        
+        Later ``embed_texts`` calls for the same texts are served without a
+        Titan request. ``None`` entries and vectors whose dimension does not
+        match the model are skipped.
+        """
+        model_id = self.config.titan_embedding_model_id
+        added_texts: List[str] = []
+        added_embeddings: List[np.ndarray] = []
+        rejected = 0
+        for text, embedding in zip(texts, embeddings):
+            if embedding is None or len(embedding) == 0:
+                continue
+            embedding = np.asarray(embedding, dtype=np.float32)
+            if embedding.shape != (self.embedding_dimension,):
+                rejected += 1
+                continue
+            self._remember(hashlib.sha256(text.encode("utf-8")).digest(), embedding)
+            added_texts.append(text)
+            added_embeddings.append(embedding)
+        if self.embedding_cache is not None and added_texts:
+            self.embedding_cache.put_many(model_id, added_texts, added_embeddings)
+        if rejected:
+            self.logger.warning(
+                f"Skipped {rejected} seeded embeddings without dimension {self.embedding_dimension}"
+            )
+        return len(added_texts)
+    
+    def _remember(self, digest: bytes, embedding: np.ndarray) -> None:
+        """Keep an embedding in the in-memory content-hash cache"""
+        self._seen_embeddings[digest] = embedding
+        if len(self._seen_embeddings) > self.SEEN_EMBEDDINGS_MAX:
+            self._seen_embeddings.popitem(last=False)
+    
+    async def embed_single(self, text: str) -> np.ndarray:
         """Generate embedding for single text"""
-        embeddings = await self.embed_texts([text])
-        return embeddings[0] if embeddings else []
+        return (await self.embed_texts([text]))[0]
     
     def get_embedding_dimension(self) -> int:
         """Return the embedding dimension for the configured model"""
-        if self._embedding_dimension is None:
-            # Titan Text Embeddings V2 dimensions
-            if "titan-embed-text-v2" in self.config.titan_embedding_model_id:
-                self._embedding_dimension = 1024
-            else:
-                # Default for other Titan models
-                self._embedding_dimension = 1536
-                
-        return self._embedding_dimension
+        return self.embedding_dimension
     
-    async def _process_batch(self, texts: List[str]) -> List[List[float]]:
-        """Process a batch of texts for embedding"""
-        embeddings = []
+    async def _process_batch(self, texts: List[str]) -> np.ndarray:
+        """Process a batch of texts for embedding
         
-        for text in texts:
-            try:
-                embedding = await self.retry_handler.execute_with_retry(
+        Titan accepts a single ``inputText`` per InvokeModel call, so the batch
+        is issued as concurrent requests bounded by ``max_concurrent_requests``.
+        """
+        
+        async def embed_one(text: str) -> np.ndarray:
+            async with self._semaphore:
+                return await self.retry_handler.execute_with_retry(
                     self._generate_single_embedding,
                     text
                 )
-                embeddings.append(embedding)
-                
-            except Exception as e:
-                self.logger.error(f"Failed to generate embedding for text: {str(e)}")
-                # Return zero vector as fallback
-                embeddings.append([0.0] * self.get_embedding_dimension())
+        
+        results = await asyncio.gather(
+            *(embed_one(text) for text in texts),
+            return_exceptions=True
+        )
+        
+        # Rows left at zero are the fallback for failed texts
+        embeddings = np.zeros((len(texts), self.embedding_dimension), dtype=np.float32)
+        for row, result in enumerate(results):
+            if isinstance(result, Exception):
+                self.logger.error(f"Failed to generate embedding for text: {str(result)}")
+            else:
+                embeddings[row] = result
                 
         return embeddings
     
-    async def _generate_single_embedding(self, text: str) -> List[float]:
+    async def _generate_single_embedding(self, text: str) -> np.ndarray:
         """Generate embedding for a single text"""
         if not text.strip():
-            return [0.0] * self.get_embedding_dimension()
+            return np.zeros(self.embedding_dimension, dtype=np.float32)
             
         # Truncate text if too long (Titan has token limits)
         if len(text) > 8000:  # Conservative limit
             text = text[:8000]
             
-        client = await self.auth.get_bedrock_client()
-        
-        request_body = self._prepare_embedding_request(text)
-        
         try:
-            response = await asyncio.to_thread(
-                client.invoke_model,
+            response_body = await self.auth.ainvoke_model_json(
                 modelId=self.config.titan_embedding_model_id,
-                body=json.dumps(request_body),
+                body=self._prepare_embedding_request(text),
                 contentType='application/json',
                 accept='application/json'
             )
             
-            response_body = json.loads(response['body'].read())
-            
             if 'embedding' in response_body:
-                return response_body['embedding']
+                return np.asarray(response_body['embedding'], dtype=np.float32)
             else:
                 raise BedrockEmbeddingError(f"No embedding in response: {response_body}")
                 
@@ -121,19 +252,10 @@ class BedrockEmbeddingProvider:
             else:
                 raise BedrockEmbeddingError(f"Bedrock API error: {str(e)}")
                 
-    def _prepare_embedding_request(
-        self,
-        text: str,
-        **kwargs
-    ) -> Dict[str, Any]:
-        """Prepare request payload for Titan embedding model"""
-        request = {
-            "inputText": text,
-            "dimensions": self.get_embedding_dimension(),
-            "normalize": True
-        }
-        
-        # Add any additional parameters
-        request.update(kwargs)
-        
-        return request
\ No newline at end of file
+    def _prepare_embedding_request(self, text: str) -> bytes:
+        """Prepare the JSON request body for Titan embedding model
+        
+        Only the text is encoded per call; it is spliced in front of the
+        precomputed suffix holding the model's other fields.
+        """
+        return b'{"inputText":' + serialization.dumps(text) + self._request_suffix
\ No newline at end of file
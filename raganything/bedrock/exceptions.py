@@ -23,6 +23,11 @@ class BedrockModelError(BedrockError):
     pass
 
 
+class BedrockEmbeddingError(BedrockModelError):
+    """Raised when there's an issue generating embeddings"""
+    pass
+
+
 class BedrockTimeoutError(BedrockError):
     """Raised when Bedrock requests timeout"""
     pass
@@ -5,27 +5,112 @@ AWS Bedrock LLM provider for Claude models
 import json
 import asyncio
 import logging
-from typing import Dict, List, Optional, Any, Union
+from typing import Dict, Iterator, List, Optional, Any, Union
 from botocore.exceptions import ClientError
 import time
 
+try:
+    import msgspec
+
+    MSGSPEC_AVAILABLE = True
+except ImportError:
+    MSGSPEC_AVAILABLE = False
+
 from .config import BedrockConfig
 from .auth import BedrockAuthenticator
 from .retry_handler import BedrockRetryHandler
+from .cache import BedrockCache, BedrockRateLimiter
+from .batch_inference import BedrockBatchCompleter
+from . import serialization
 from .exceptions import BedrockModelError, BedrockTimeoutError, BedrockRateLimitError
 
 
 logger = logging.getLogger(__name__)
 
+_MESSAGE_KEYS = frozenset(("role", "content"))
+# Request fields a caller may set per call through kwargs
+_REQUEST_OVERRIDES = frozenset(("max_tokens", "temperature", "top_p", "top_k", "stop_sequences"))
+
+
+if MSGSPEC_AVAILABLE:
+
+    class _StreamText(msgspec.Struct):
+        type: str = ""
+        text: Optional[str] = None
+
+    class _StreamChunk(msgspec.Struct):
+        delta: Optional[_StreamText] = None
+        content: Optional[List[_StreamText]] = None
+
+    # Decodes only the fields we read; everything else in an event is skipped
+    _STREAM_CHUNK_DECODER = msgspec.json.Decoder(_StreamChunk)
+
+
+def _stream_chunk_texts(data: bytes) -> Iterator[str]:
+    """Yield the text carried by one streamed Claude event"""
+    if MSGSPEC_AVAILABLE:
+        chunk = _STREAM_CHUNK_DECODER.decode(data)
+        if chunk.delta is not None and chunk.delta.text is not None:
+            yield chunk.delta.text
+        elif chunk.content:
+            for content in chunk.content:
+                if content.type == 'text':
+                    yield content.text or ''
+        return
+    
+    chunk_data = serialization.loads(data)
+    if 'delta' in chunk_data and 'text' in chunk_data['delta']:
+        yield chunk_data['delta']['text']
+    elif 'content' in chunk_data:
+        for content in chunk_data['content']:
+            if content.get('type') == 'text':
+                yield content.get('text', '')
+
 
 class BedrockLLMProvider:
     """Provide LLM functionality using AWS Bedrock Claude models"""
     
+    # Model ID prefixes, after any cross-region inference profile prefix such
+    # as "us.", of Claude models that accept cache_control checkpoints
+    PROMPT_CACHING_MODELS = (
+        "anthropic.claude-3-5-haiku",
+        "anthropic.claude-3-5-sonnet-20241022-v2",
+        "anthropic.claude-3-7-sonnet",
+        "anthropic.claude-sonnet-4",
+        "anthropic.claude-opus-4",
+        "anthropic.claude-haiku-4",
+    )
+    
     def __init__(self, config: BedrockConfig, authenticator: BedrockAuthenticator):
         self.config = config
         self.auth = authenticator
         self.retry_handler = BedrockRetryHandler(config.get_retry_config())
         self._semaphore = asyncio.Semaphore(config.max_concurrent_requests)
+        # Spreads requests over time to stay under the Bedrock request quota;
+        # the semaphore alone only bounds how many run at once
+        self._rate_limiter: Optional[BedrockRateLimiter] = None
+        if config.requests_per_second is not None:
+            self._rate_limiter = BedrockRateLimiter(
+                requests_per_second=config.requests_per_second,
+                burst_size=max(1, int(config.requests_per_second))
+            )
+        self.response_cache: Optional[BedrockCache] = None
+        if config.response_cache_enabled:
+            self.response_cache = BedrockCache(
+                max_size=config.response_cache_max_entries,
+                default_ttl=config.response_cache_ttl
+            )
+        # Futures of requests in flight, keyed like the response cache
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.batch_completer = BedrockBatchCompleter(config, authenticator)
+        # Request fields fixed by the config; per-call kwargs override them
+        self._request_template = {
+            "max_tokens": config.max_tokens,
+            "temperature": config.temperature,
+            "top_p": config.top_p,
+            "top_k": config.top_k,
+            "anthropic_version": "bedrock-2023-05-31"
+        }
         
     async def complete(
         self,
@@ -33,9 +118,17 @@ class BedrockLLMProvider:
         system_prompt: Optional[str] = None,
         history_messages: Optional[List[Dict]] = None,
         model_id: Optional[str] = None,
+        no_cache: bool = False,
         **kwargs
     ) -> str:
-        """Generate text completion using Claude models"""
+        """Generate text completion using Claude models
+        
+        A call whose request payload matches one already in flight waits for
+        that call's result instead of sending a duplicate request. With the
+        response cache enabled, stateless calls (no history) matching an
+        earlier call are answered from memory. Pass ``no_cache=True`` to
+        always call the model.
+        """
         
         # Use default model if not specified
         if model_id is None:
@@ -46,15 +139,58 @@ class BedrockLLMProvider:
             prompt=prompt,
             system_prompt=system_prompt,
             history_messages=history_messages,
+            model_id=model_id,
             **kwargs
         )
         
-        # Execute request with retry logic
+        if no_cache:
+            return await self._complete_request(model_id, request_payload)
+        
+        request_key = BedrockCache.make_key({"model_id": model_id, **request_payload})
+        use_cache = self.response_cache is not None and not history_messages
+        if use_cache:
+            # A loop is running here, so expired answers can be swept in the background
+            self.response_cache.start_periodic_cleanup()
+            cached = self.response_cache.get(request_key)
+            if cached is not None:
+                logger.debug(f"Response cache hit for model {model_id}")
+                return cached
+        
+        inflight = self._inflight.get(request_key)
+        if inflight is not None:
+            # Shield so a cancelled duplicate does not cancel the shared call
+            return await asyncio.shield(inflight)
+        
+        future = asyncio.get_running_loop().create_future()
+        # Mark the outcome as retrieved when no duplicate ever awaits it
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._inflight[request_key] = future
+        try:
+            text = await self._complete_request(model_id, request_payload)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            del self._inflight[request_key]
+        
+        future.set_result(text)
+        if use_cache and text:
+            self.response_cache.put(request_key, text)
+        return text
+    
+    async def _complete_request(self, model_id: str, request_payload: Dict) -> str:
+        """Send a prepared request with retry logic and return its text"""
+        # Serialize once; retries resend the same bytes
+        request_body = serialization.dumps(request_payload)
+        
         async with self._semaphore:
             response = await self.retry_handler.execute_with_retry(
                 self._invoke_model,
                 model_id=model_id,
-                request_payload=request_payload
+                request_body=request_body
             )
         
         return self._extract_text_from_response(response)
@@ -82,28 +218,50 @@ class BedrockLLMProvider:
         model_id: Optional[str] = None,
         **kwargs
     ) -> List[str]:
-        """Process multiple prompts efficiently"""
+        """Process multiple prompts efficiently
+        
+        Repeated prompts are sent once and share the result. When
+        ``batch_job_threshold`` is set and batch inference is configured,
+        large batches run as a batch inference job. Remaining prompts are fed
+        through a queue to ``max_concurrent_requests`` workers, so request
+        payloads are only built as workers become free.
+        """
         
         if not prompts:
             return []
         
-        # Create tasks for concurrent processing
-        tasks = []
-        for prompt in prompts:
-            task = self.complete(
-                prompt=prompt,
-                system_prompt=system_prompt,
-                model_id=model_id,
-                **kwargs
-            )
-            tasks.append(task)
+        unique_prompts = list(dict.fromkeys(prompts))
+        results: List[Any] = [None] * len(unique_prompts)
+        
+        if self._use_batch_job(len(unique_prompts)):
+            await self._complete_with_batch_job(unique_prompts, results, system_prompt, model_id, kwargs)
+        
+        queue: "asyncio.Queue[int]" = asyncio.Queue()
+        for index, result in enumerate(results):
+            if result is None:
+                queue.put_nowait(index)
         
-        # Execute all tasks concurrently
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        async def worker() -> None:
+            while not queue.empty():
+                index = queue.get_nowait()
+                try:
+                    results[index] = await self.complete(
+                        prompt=unique_prompts[index],
+                        system_prompt=system_prompt,
+                        model_id=model_id,
+                        **kwargs
+                    )
+                except Exception as e:
+                    results[index] = e
+        
+        workers = min(self.config.max_concurrent_requests, queue.qsize())
+        await asyncio.gather(*(worker() for _ in range(workers)))
         
         # Process results and handle exceptions
+        results_by_prompt = dict(zip(unique_prompts, results))
         processed_results = []
-        for i, result in enumerate(results):
+        for i, prompt in enumerate(prompts):
+            result = results_by_prompt[prompt]
             if isinstance(result, Exception):
                 logger.error(f"Error processing prompt {i}: {str(result)}")
                 processed_results.append(f"Error: {str(result)}")
@@ -112,6 +270,47 @@ class BedrockLLMProvider:
         
         return processed_results
     
+    def _use_batch_job(self, count: int) -> bool:
+        """Return True if count prompts should run as a batch inference job"""
+        threshold = self.config.batch_job_threshold
+        return (
+            threshold is not None
+            and count >= max(threshold, BedrockBatchCompleter.MIN_RECORDS)
+            and self.batch_completer.is_configured()
+        )
+    
+    async def _complete_with_batch_job(
+        self,
+        prompts: List[str],
+        results: List[Any],
+        system_prompt: Optional[str],
+        model_id: Optional[str],
+        kwargs: Dict[str, Any]
+    ) -> None:
+        """Fill results with batch job completions, leaving failures as None"""
+        if model_id is None:
+            model_id = self.config.claude_model_id
+        
+        request_payloads = [
+            self._prepare_claude_request(
+                prompt=prompt,
+                system_prompt=system_prompt,
+                model_id=model_id,
+                **kwargs
+            )
+            for prompt in prompts
+        ]
+        
+        try:
+            responses = await self.batch_completer.complete_requests(model_id, request_payloads)
+        except Exception as e:
+            logger.warning(f"Batch inference job failed, completing prompts on demand: {str(e)}")
+            return
+        
+        for index, response in enumerate(responses):
+            if response is not None:
+                results[index] = self._extract_text_from_response(response)
+    
     async def complete_streaming(
         self,
         prompt: str,
@@ -131,34 +330,56 @@ class BedrockLLMProvider:
             prompt=prompt,
             system_prompt=system_prompt,
             history_messages=history_messages,
+            model_id=model_id,
             **kwargs
         )
         
         # Execute streaming request
         async with self._semaphore:
-            async for chunk in self._invoke_model_streaming(model_id, request_payload):
-                yield chunk
+            stream = self._invoke_model_streaming(model_id, request_payload)
+            try:
+                async for chunk in stream:
+                    yield chunk
+            finally:
+                # Close the response stream right away when the consumer stops early
+                await stream.aclose()
     
     def _prepare_claude_request(
         self,
         prompt: str,
         system_prompt: Optional[str] = None,
         history_messages: Optional[List[Dict]] = None,
+        model_id: Optional[str] = None,
         **kwargs
     ) -> Dict:
         """Prepare request payload for Claude models"""
         
-        # Build messages array
-        messages = []
+        if model_id is None:
+            model_id = self.config.claude_model_id
+        use_cache = self.config.prompt_caching_enabled and self._supports_prompt_caching(model_id)
         
-        # Add history messages if provided
-        if history_messages:
-            for msg in history_messages:
-                if isinstance(msg, dict) and 'role' in msg and 'content' in msg:
-                    messages.append({
-                        "role": msg["role"],
-                        "content": msg["content"]
-                    })
+        # Build messages array. Well-formed history messages are forwarded
+        # as-is; only messages carrying extra keys are rebuilt
+        messages = [
+            msg if len(msg) == 2 else {"role": msg["role"], "content": msg["content"]}
+            for msg in history_messages or ()
+            if isinstance(msg, dict) and msg.keys() >= _MESSAGE_KEYS
+        ]
+        
+        # Checkpoint the last history turn so the conversation so far is
+        # cached, once the prefix is long enough for the model to cache it
+        if use_cache and messages:
+            # String content is measured directly; only block lists are serialized
+            prefix_chars = len(system_prompt or "") + sum(
+                len(content) if isinstance(content, str) else len(serialization.dumps(content))
+                for content in (msg["content"] for msg in messages)
+            )
+            if prefix_chars // 4 >= self._min_cacheable_tokens(model_id):
+                # Copy rather than mutate the caller's history message
+                messages[-1] = {
+                    "role": messages[-1]["role"],
+                    "content": self._with_cache_control(messages[-1]["content"])
+                }
         
         # Add current prompt as user message
         messages.append({
@@ -167,38 +388,58 @@ class BedrockLLMProvider:
         })
         
         # Build request payload
-        request_body = {
-            "messages": messages,
-            "max_tokens": kwargs.get("max_tokens", self.config.max_tokens),
-            "temperature": kwargs.get("temperature", self.config.temperature),
-            "top_p": kwargs.get("top_p", self.config.top_p),
-            "top_k": kwargs.get("top_k", self.config.top_k),
-            "anthropic_version": "bedrock-2023-05-31"
-        }
+        request_body = {"messages": messages, **self._request_template}
+        for key in _REQUEST_OVERRIDES.intersection(kwargs):
+            request_body[key] = kwargs[key]
         
-        # Add system prompt if provided
+        # Add system prompt if provided. With prompt caching enabled the system
+        # prompt (which carries the retrieved RAG context) becomes a cache
+        # checkpoint, so requests sharing that prefix skip re-processing it.
         if system_prompt:
-            request_body["system"] = system_prompt
-        
-        # Add stop sequences if provided
-        if "stop_sequences" in kwargs:
-            request_body["stop_sequences"] = kwargs["stop_sequences"]
+            if use_cache:
+                request_body["system"] = self._with_cache_control(system_prompt)
+            else:
+                request_body["system"] = system_prompt
         
         return request_body
     
-    async def _invoke_model(self, model_id: str, request_payload: Dict) -> Dict:
-        """Invoke Bedrock model with request payload"""
+    def _supports_prompt_caching(self, model_id: str) -> bool:
+        """Return True if the model accepts cache_control checkpoints"""
+        _, sep, base_id = model_id.partition("anthropic.")
+        return bool(sep) and ("anthropic." + base_id).startswith(self.PROMPT_CACHING_MODELS)
+    
+    @staticmethod
+    def _min_cacheable_tokens(model_id: str) -> int:
+        """Shortest prefix, in tokens, that the model will cache"""
+        return 2048 if "haiku" in model_id else 1024
+    
+    def _with_cache_control(self, content: Union[str, List[Dict]]) -> List[Dict]:
+        """Return content as blocks with a cache checkpoint on the last block"""
+        cache_control = {"type": "ephemeral"}
+        if self.config.prompt_cache_retention == "long":
+            cache_control["ttl"] = "1h"
+        
+        if isinstance(content, str):
+            return [{"type": "text", "text": content, "cache_control": cache_control}]
+        
+        blocks = list(content)
+        if blocks and isinstance(blocks[-1], dict):
+            blocks[-1] = {**blocks[-1], "cache_control": cache_control}
+        return blocks
+    
+    async def _invoke_model(self, model_id: str, request_body: bytes) -> Dict:
+        """Invoke Bedrock model with a serialized JSON request body"""
+        # Taken per attempt so retries are paced as well
+        if self._rate_limiter is not None:
+            await self._rate_limiter.acquire()
+        
         try:
-            client = await self.auth.get_bedrock_runtime_client()
-            
-            # Convert request payload to JSON
-            request_body = json.dumps(request_payload)
-            
             logger.debug(f"Invoking model {model_id} with payload size: {len(request_body)} bytes")
             
-            # Make the API call
+            # Make the API call; the response body is read and parsed in the
+            # worker thread too, so the event loop never blocks on the socket
             start_time = time.time()
-            response = client.invoke_model(
+            response_body = await self.auth.ainvoke_model_json(
                 modelId=model_id,
                 body=request_body,
                 contentType="application/json",
@@ -209,13 +450,16 @@ class BedrockLLMProvider:
             response_time = time.time() - start_time
             logger.debug(f"Model {model_id} responded in {response_time:.2f} seconds")
             
-            # Parse response
-            response_body = json.loads(response['body'].read())
-            
             # Log token usage if available
             if 'usage' in response_body:
                 usage = response_body['usage']
-                logger.info(f"Token usage - Input: {usage.get('input_tokens', 0)}, Output: {usage.get('output_tokens', 0)}")
+                logger.info(
+                    "Token usage - Input: %d, Output: %d, Cache read: %d, Cache write: %d",
+                    usage.get('input_tokens', 0),
+                    usage.get('output_tokens', 0),
+                    usage.get('cache_read_input_tokens', 0),
+                    usage.get('cache_creation_input_tokens', 0),
+                )
             
             return response_body
             
@@ -242,16 +486,18 @@ class BedrockLLMProvider:
     
     async def _invoke_model_streaming(self, model_id: str, request_payload: Dict):
         """Invoke Bedrock model with streaming response"""
+        if self._rate_limiter is not None:
+            await self._rate_limiter.acquire()
+        
         try:
-            client = await self.auth.get_bedrock_runtime_client()
-            
             # Convert request payload to JSON
-            request_body = json.dumps(request_payload)
+            request_body = serialization.dumps(request_payload)
             
             logger.debug(f"Invoking streaming model {model_id}")
             
-            # Make the streaming API call
-            response = client.invoke_model_with_response_stream(
+            # Make the streaming API call; blocking reads run in a worker
+            # thread so other requests progress while this one streams
+            response = await self.auth.ainvoke_model_with_response_stream(
                 modelId=model_id,
                 body=request_body,
                 contentType="application/json",
@@ -261,18 +507,19 @@ class BedrockLLMProvider:
             # Process streaming response
             stream = response.get('body')
             if stream:
-                for event in stream:
-                    chunk = event.get('chunk')
-                    if chunk:
-                        chunk_data = json.loads(chunk.get('bytes').decode())
-                        
-                        # Extract text from chunk
-                        if 'delta' in chunk_data and 'text' in chunk_data['delta']:
-                            yield chunk_data['delta']['text']
-                        elif 'content' in chunk_data:
-                            for content in chunk_data['content']:
-                                if content.get('type') == 'text':
-                                    yield content.get('text', '')
+                events = iter(stream)
+                try:
+                    while True:
+                        event = await self.auth.run_in_executor(next, events, None)
+                        if event is None:
+                            break
+                        chunk = event.get('chunk')
+                        if chunk:
+                            for text in _stream_chunk_texts(chunk.get('bytes')):
+                                yield text
+                finally:
+                    # Release the connection when the consumer stops early
+                    stream.close()
             
         except ClientError as e:
             error_code = e.response.get('Error', {}).get('Code', 'Unknown')
@@ -285,14 +532,21 @@ class BedrockLLMProvider:
     def _extract_text_from_response(self, response: Dict) -> str:
         """Extract text content from Claude response"""
         try:
-            # Claude response format
-            if 'content' in response:
-                content_blocks = response['content']
-                if isinstance(content_blocks, list) and len(content_blocks) > 0:
-                    # Get the first text block
-                    for block in content_blocks:
-                        if isinstance(block, dict) and block.get('type') == 'text':
-                            return block.get('text', '')
+            # Claude response format; the reply almost always opens with its
+            # text block, so read index 0 directly before scanning
+            content_blocks = response.get('content')
+            try:
+                block = content_blocks[0]
+                if block['type'] == 'text':
+                    return block['text']
+            except (KeyError, IndexError, TypeError):
+                pass
+            
+            # The text block follows another block type (e.g. tool_use)
+            if isinstance(content_blocks, list):
+                for block in content_blocks[1:]:
+                    if isinstance(block, dict) and block.get('type') == 'text':
+                        return block.get('text', '')
             
             # Fallback: look for direct text field
             if 'text' in response:
@@ -306,6 +560,11 @@ class BedrockLLMProvider:
             logger.error(f"Error extracting text from response: {str(e)}")
             return ""
     
+    def close(self) -> None:
+        """Stop the response cache's background cleanup"""
+        if self.response_cache is not None:
+            self.response_cache.stop_periodic_cleanup()
+    
     async def get_model_info(self, model_id: Optional[str] = None) -> Dict:
         """Get information about a specific model"""
         if model_id is None:
@@ -112,7 +112,9 @@ class BedrockLogger:
         )
         
         # Log request details at debug level
-        self.logger.debug(f"Request data: {json.dumps(request_data, indent=2)}", extra=extra)
+        # Guarded so large payloads (e.g. base64 images) are not serialized for nothing
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug(f"Request data: {json.dumps(request_data, indent=2)}", extra=extra)
     
     def log_response(self, operation: str, model_id: str, response_data: Dict[str, Any],
                     response_time: float, aws_request_id: str = None):
@@ -128,7 +130,9 @@ class BedrockLogger:
         )
         
         # Log response details at debug level
-        self.logger.debug(f"Response data: {json.dumps(response_data, indent=2)}", extra=extra)
+        # Guarded so large payloads (e.g. base64 images) are not serialized for nothing
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug(f"Response data: {json.dumps(response_data, indent=2)}", extra=extra)
     
     def log_error(self, operation: str, model_id: str, error: Exception,
                  aws_request_id: str = None):
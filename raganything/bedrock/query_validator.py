@@ -0,0 +1,27 @@
+"""
+Pre-retrieval query classification for AWS Bedrock RAG queries
+"""
+
+import re
+
+
+class QueryValidator:
+    """Decide whether a query needs retrieval before it is answered
+
+    Purely conversational queries (greetings, thanks, acknowledgements) carry
+    no information need, so retrieval and the embedding call behind it can be
+    skipped and the model answered directly.
+    """
+
+    SKIP_PATTERNS = re.compile(
+        r"^\s*(?:"
+        r"hi|hello|hey|howdy|good\s+(?:morning|afternoon|evening)"
+        r"|thanks|thank\s+you|thx|cheers"
+        r"|ok(?:ay)?|got\s+it|great|cool|bye|goodbye"
+        r")(?:\s+(?:there|so\s+much|a\s+lot|again))?\s*[!.?]*\s*$",
+        re.IGNORECASE,
+    )
+
+    def needs_rag(self, query: str) -> bool:
+        """Return False when the query can be answered without retrieval"""
+        return not self.SKIP_PATTERNS.match(query)
@@ -0,0 +1,64 @@
+"""
+Similarity scoring kernels for AWS Bedrock embeddings
+
+Inputs are expected to be L2-normalized, so the dot product is the cosine
+similarity. Caches hold at most a few thousand rows, which a single NumPy
+matrix-vector product scores in well under a millisecond.
+"""
+
+from typing import Tuple
+
+import numpy as np
+
+
+def quantize_int8(vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Quantize vectors to int8 with one scale per vector
+
+    Args:
+        vectors: Array of shape (dim,) or (n, dim)
+
+    Returns:
+        Tuple of (int8 values, float32 scales) such that
+        ``values * scales[..., None]`` approximates the input
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    scales = np.abs(vectors).max(axis=-1) / 127.0
+    scales = np.where(scales == 0.0, 1.0, scales).astype(np.float32)
+    values = np.round(vectors / scales[..., np.newaxis]).astype(np.int8)
+    return values, scales
+
+
+def _select_topk(scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    if k >= scores.shape[0]:
+        order = np.argsort(-scores)
+    else:
+        candidates = np.argpartition(-scores, k - 1)[:k]
+        order = candidates[np.argsort(-scores[candidates])]
+    return order.astype(np.int64), scores[order].astype(np.float32)
+
+
+def topk_cosine_int8(
+    query: np.ndarray,
+    query_scale: float,
+    matrix: np.ndarray,
+    scales: np.ndarray,
+    k: int = 1,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Return indices and scores of the k most similar rows of an int8 matrix
+
+    Args:
+        query: int8 query vector of shape (dim,), from ``quantize_int8``
+        query_scale: Scale of the query vector
+        matrix: int8 row vectors of shape (n, dim), from ``quantize_int8``
+        scales: float32 per-row scales of shape (n,)
+        k: Number of results to return
+
+    Returns:
+        Tuple of (indices, approximate cosine scores), best match first
+    """
+    if matrix.shape[0] == 0 or k <= 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+    dots = np.asarray(matrix).astype(np.int32) @ np.asarray(query).astype(np.int32)
+    scores = dots * np.asarray(scales, dtype=np.float32) * np.float32(query_scale)
+    return _select_topk(scores, k)
@@ -0,0 +1,282 @@
+"""
+Semantic response cache for AWS Bedrock RAG queries
+"""
+
+import os
+import json
+import time
+import logging
+from pathlib import Path
+from typing import List, Optional, Sequence, Union
+
+import numpy as np
+
+from .scoring import quantize_int8, topk_cosine_int8
+
+
+logger = logging.getLogger(__name__)
+
+
+class SemanticCache:
+    """Cache query responses keyed on the similarity of query embeddings
+
+    Embeddings are L2-normalized and stored int8-quantized with a per-row
+    scale, so a lookup is one int8 matrix-vector product followed by an
+    argmax over a quarter of the float32 memory. Entries carry a namespace
+    (e.g. query mode and attached content) and only match lookups in the
+    same namespace. Entries expire after ``ttl`` seconds, and once the cache
+    holds ``max_entries`` the least recently used entry is evicted.
+
+    Entries live in preallocated arrays that grow by doubling, so ``store``
+    does not copy the cache. Nothing is written to ``persist_path`` until
+    ``save()`` is called.
+    """
+
+    INITIAL_CAPACITY = 64
+
+    def __init__(
+        self,
+        dimension: int,
+        similarity_threshold: float = 0.95,
+        ttl: Optional[float] = 3600,
+        max_entries: Optional[int] = 1000,
+        persist_path: Optional[Union[str, Path]] = None,
+    ):
+        self.dimension = dimension
+        self.similarity_threshold = similarity_threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.persist_path = Path(persist_path) if persist_path else None
+
+        self._allocate(self.INITIAL_CAPACITY)
+        # True when entries changed since the last save or load
+        self._dirty = False
+
+        if self.persist_path is not None and self.persist_path.exists():
+            self.load()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _allocate(self, capacity: int) -> None:
+        """Reset to an empty cache with room for ``capacity`` entries"""
+        self._size = 0
+        self._embeddings_buf = np.empty((capacity, self.dimension), dtype=np.int8)
+        self._scales_buf = np.empty(capacity, dtype=np.float32)
+        self._timestamps_buf = np.empty(capacity, dtype=np.float64)
+        self._last_used_buf = np.empty(capacity, dtype=np.float64)
+        self._namespaces_buf = np.empty(capacity, dtype=object)
+        self._responses: List[str] = []
+
+    def _buffers(self) -> List[str]:
+        return ["_embeddings_buf", "_scales_buf", "_timestamps_buf", "_last_used_buf", "_namespaces_buf"]
+
+    def _reserve(self, capacity: int) -> None:
+        """Grow the arrays to hold at least ``capacity`` entries"""
+        current = self._scales_buf.shape[0]
+        if capacity <= current:
+            return
+        new_capacity = max(capacity, current * 2)
+        for name in self._buffers():
+            old = getattr(self, name)
+            grown = np.empty((new_capacity,) + old.shape[1:], dtype=old.dtype)
+            grown[:self._size] = old[:self._size]
+            setattr(self, name, grown)
+
+    @property
+    def _embeddings(self) -> np.ndarray:
+        return self._embeddings_buf[:self._size]
+
+    @property
+    def _scales(self) -> np.ndarray:
+        return self._scales_buf[:self._size]
+
+    @property
+    def _timestamps(self) -> np.ndarray:
+        return self._timestamps_buf[:self._size]
+
+    @property
+    def _last_used(self) -> np.ndarray:
+        return self._last_used_buf[:self._size]
+
+    @property
+    def _namespaces(self) -> np.ndarray:
+        return self._namespaces_buf[:self._size]
+
+    def _normalize(self, embedding: Sequence[float]) -> Optional[np.ndarray]:
+        """Convert an embedding to a unit-length float32 vector"""
+        vector = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        if vector.shape[0] != self.dimension:
+            return None
+        norm = np.linalg.norm(vector)
+        if norm == 0.0:
+            return None
+        return vector / norm
+
+    def lookup(self, embedding: Sequence[float], namespace: str = "") -> Optional[str]:
+        """Return the cached response for the most similar query, if close enough"""
+        if not self._size:
+            return None
+
+        self.cleanup_expired()
+        if not self._size:
+            return None
+
+        query = self._normalize(embedding)
+        if query is None:
+            return None
+
+        candidates = np.flatnonzero(self._namespaces == namespace)
+        if len(candidates) == 0:
+            return None
+
+        if len(candidates) == self._size:
+            embeddings, scales = self._embeddings, self._scales
+        else:
+            embeddings, scales = self._embeddings[candidates], self._scales[candidates]
+
+        query_values, query_scale = quantize_int8(query)
+        indices, scores = topk_cosine_int8(query_values, query_scale, embeddings, scales, 1)
+        if scores[0] < self.similarity_threshold:
+            return None
+
+        logger.debug(f"Semantic cache hit (similarity {scores[0]:.4f})")
+        index = int(candidates[indices[0]])
+        self._last_used_buf[index] = time.time()
+        return self._responses[index]
+
+    def store(self, embedding: Sequence[float], response: str, namespace: str = "") -> None:
+        """Add a query embedding and its response to the cache"""
+        vector = self._normalize(embedding)
+        if vector is None:
+            return
+
+        values, scale = quantize_int8(vector)
+        now = time.time()
+        self._reserve(self._size + 1)
+        index = self._size
+        self._embeddings_buf[index] = values
+        self._scales_buf[index] = scale
+        self._timestamps_buf[index] = now
+        self._last_used_buf[index] = now
+        self._namespaces_buf[index] = namespace
+        self._responses.append(response)
+        self._size += 1
+        self._dirty = True
+        self._evict_lru()
+
+    def cleanup_expired(self) -> int:
+        """Remove expired entries and return count removed"""
+        if self.ttl is None or not self._size:
+            return 0
+
+        keep = (time.time() - self._timestamps) <= self.ttl
+        removed = self._keep(keep)
+        if removed:
+            logger.debug(f"Removed {removed} expired semantic cache entries")
+
+        return removed
+
+    def _evict_lru(self) -> int:
+        """Drop least recently used entries beyond ``max_entries``"""
+        excess = self._size - self.max_entries if self.max_entries else 0
+        if excess <= 0:
+            return 0
+
+        keep = np.ones(self._size, dtype=bool)
+        keep[np.argpartition(self._last_used, excess - 1)[:excess]] = False
+        return self._keep(keep)
+
+    def _keep(self, keep: np.ndarray) -> int:
+        """Retain entries where ``keep`` is True and return count removed"""
+        kept = np.flatnonzero(keep)
+        removed = self._size - len(kept)
+        if removed:
+            # Compact in place; the arrays keep their capacity
+            for name in self._buffers():
+                buf = getattr(self, name)
+                buf[:len(kept)] = buf[kept]
+            self._responses = [self._responses[i] for i in kept]
+            self._size = len(kept)
+            self._dirty = True
+        return removed
+
+    def clear(self) -> None:
+        """Clear all cache entries"""
+        self._allocate(self.INITIAL_CAPACITY)
+        self._dirty = False
+
+        if self.persist_path is not None:
+            self.persist_path.unlink(missing_ok=True)
+
+    def save(self) -> None:
+        """Persist the cache to ``persist_path`` if it changed since the last save"""
+        if self.persist_path is None or not self._dirty:
+            return
+
+        self.persist_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.persist_path.with_name(self.persist_path.name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                embeddings=self._embeddings,
+                scales=self._scales,
+                timestamps=self._timestamps,
+                last_used=self._last_used,
+                namespaces=self._namespaces.astype(np.str_),
+                # UTF-8 JSON rather than a fixed-width str array, which would
+                # pad every answer to the longest one in UTF-32
+                responses_json=np.frombuffer(
+                    json.dumps(self._responses, ensure_ascii=False).encode("utf-8"), dtype=np.uint8
+                ),
+            )
+        os.replace(tmp_path, self.persist_path)
+        self._dirty = False
+
+    def load(self) -> None:
+        """Load the cache from ``persist_path``"""
+        try:
+            with np.load(self.persist_path) as data:
+                embeddings = data["embeddings"]
+                if embeddings.ndim != 2 or embeddings.shape[1] != self.dimension:
+                    logger.warning(
+                        f"Ignoring semantic cache at {self.persist_path}: dimension mismatch"
+                    )
+                    return
+                if "scales" in data:
+                    embeddings = embeddings.astype(np.int8)
+                    scales = data["scales"].astype(np.float32)
+                else:
+                    # Caches written before quantization hold float32 embeddings
+                    embeddings, scales = quantize_int8(embeddings)
+                timestamps = data["timestamps"].astype(np.float64)
+                if "last_used" in data:
+                    last_used = data["last_used"].astype(np.float64)
+                else:
+                    last_used = timestamps.copy()
+                if "responses_json" in data:
+                    responses = json.loads(data["responses_json"].tobytes().decode("utf-8"))
+                else:
+                    responses = [str(r) for r in data["responses"]]
+                if "namespaces" in data:
+                    namespaces = data["namespaces"].astype(object)
+                else:
+                    namespaces = np.full(len(responses), "", dtype=object)
+        except Exception as e:
+            logger.warning(f"Failed to load semantic cache from {self.persist_path}: {e}")
+            return
+
+        count = len(responses)
+        self._allocate(max(self.INITIAL_CAPACITY, count))
+        self._embeddings_buf[:count] = embeddings
+        self._scales_buf[:count] = scales
+        self._timestamps_buf[:count] = timestamps
+        self._last_used_buf[:count] = last_used
+        self._namespaces_buf[:count] = namespaces
+        self._responses = responses
+        self._size = count
+
+        self.cleanup_expired()
+        self._evict_lru()
+        self._dirty = False
+        logger.info(f"Loaded {len(self)} semantic cache entries from {self.persist_path}")
@@ -0,0 +1,49 @@
+"""
+JSON (de)serialization for AWS Bedrock request and response bodies
+
+Uses ``orjson`` when it is installed and falls back to the standard library.
+NumPy arrays and scalars (e.g. embedding vectors) are serialized as JSON
+numbers in both cases.
+"""
+
+import json
+from typing import Any
+
+import numpy as np
+
+try:
+    import orjson
+
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, (np.ndarray, np.generic)):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj: Any, sort_keys: bool = False) -> bytes:
+    """Serialize obj to a UTF-8 encoded JSON body
+
+    Pass ``sort_keys=True`` for a canonical form, e.g. when hashing.
+    """
+    if ORJSON_AVAILABLE:
+        option = orjson.OPT_SERIALIZE_NUMPY
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=_default, option=option)
+    return json.dumps(obj, default=_default, sort_keys=sort_keys, ensure_ascii=False).encode("utf-8")
+
+
+def loads(data: Any) -> Any:
+    """Deserialize a JSON body given as bytes or str
+
+    Raises ``json.JSONDecodeError`` on invalid input; ``orjson``'s error is a
+    subclass of it.
+    """
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
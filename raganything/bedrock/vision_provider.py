@@ -2,7 +2,6 @@
 AWS Bedrock vision provider for multimodal image analysis
 """
 
-import json
 import asyncio
 import logging
 import base64
@@ -14,6 +13,7 @@ from botocore.exceptions import ClientError
 from .config import BedrockConfig
 from .auth import BedrockAuthenticator
 from .retry_handler import BedrockRetryHandler
+from . import serialization
 from .exceptions import BedrockModelError, BedrockTimeoutError
 
 
@@ -308,24 +308,19 @@ class BedrockVisionProvider:
     async def _invoke_vision_model(self, model_id: str, request_payload: Dict) -> Dict:
         """Invoke Bedrock vision model with request payload"""
         try:
-            client = await self.auth.get_bedrock_runtime_client()
-            
             # Convert request payload to JSON
-            request_body = json.dumps(request_payload)
+            request_body = serialization.dumps(request_payload)
             
             logger.debug(f"Invoking vision model {model_id} with payload size: {len(request_body)} bytes")
             
-            # Make the API call
-            response = client.invoke_model(
+            # Make the API call and parse the response off the event loop
+            response_body = await self.auth.ainvoke_model_json(
                 modelId=model_id,
                 body=request_body,
                 contentType="application/json",
                 accept="application/json"
             )
             
-            # Parse response
-            response_body = json.loads(response['body'].read())
-            
             # Log token usage if available
             if 'usage' in response_body:
                 usage = response_body['usage']
@@ -3,24 +3,108 @@ BedrockRAGAnything - RAGAnything with AWS Bedrock integration
 """
 
 import asyncio
+import functools
+import hashlib
+import inspect
+import json
 import logging
-from typing import Optional, Callable, Dict, Any, List
+import os
+from pathlib import Path
+from typing import Optional, Callable, Dict, Any, List, AsyncIterator
 from dataclasses import dataclass
 
+import numpy as np
+from lightrag import QueryParam
 from lightrag.utils import EmbeddingFunc
 
 from .raganything import RAGAnything
 from .config import RAGAnythingConfig
+from .utils import separate_content
 from .bedrock import (
     BedrockConfig,
     BedrockAuthenticator,
     BedrockLLMProvider,
     BedrockVisionProvider,
     BedrockEmbeddingProvider,
-    BedrockConfigurationError
+    BedrockBatchEmbedder,
+    BedrockConfigurationError,
+    SemanticCache,
+    DiskEmbeddingCache,
+    QueryValidator
 )
 
 
+DIRECT_SYSTEM_PROMPT = "You are a helpful assistant. Reply briefly and conversationally."
+
+ADAPTIVE_DRAFT_SYSTEM_PROMPT = """Answer the question using only the provided context.
+After the answer, add a final line "GRADE: yes" if the context was sufficient to answer \
+the question completely and accurately, or "GRADE: no" if it was not."""
+
+ADAPTIVE_SYNTHESIS_SYSTEM_PROMPT = """Answer the question using the provided context. \
+Be thorough and accurate, and say so when the context does not contain the answer."""
+
+
+def _semantic_cache_namespace(method_name: str, arguments: Dict[str, Any]) -> str:
+    """Namespace semantic cache entries by query method, mode and other arguments
+    
+    Every argument except the query text is part of the namespace, so calls
+    that differ in ``top_k``, ``response_type``, multimodal content or any
+    other query parameter never share cached answers.
+    """
+    arguments = dict(arguments)
+    arguments.pop("self", None)
+    arguments.pop("query", None)
+    arguments.update(arguments.pop("kwargs", None) or {})
+    namespace = f"{method_name}|{arguments.pop('mode', None) or ''}"
+    if arguments:
+        content = json.dumps(arguments, sort_keys=True, ensure_ascii=False, default=str)
+        namespace += "|" + hashlib.sha256(content.encode("utf-8")).hexdigest()
+    return namespace
+
+
+def semantic_cached(query_method: Callable) -> Callable:
+    """Serve near-duplicate queries from the instance's semantic cache
+    
+    The query is embedded once with Titan; when a previously answered query
+    with the same mode and query parameters is similar enough, the cached
+    response is returned without retrieval or generation. Inserting documents
+    clears the cache, so answers never predate the knowledge base. Pass
+    ``no_cache=True`` to bypass the cache for a single call, and
+    ``precomputed_embedding`` to reuse a query embedding computed earlier
+    (e.g. in one ``aembed_batch`` call for several queries).
+    """
+    signature = inspect.signature(query_method)
+    
+    @functools.wraps(query_method)
+    async def wrapper(self, query: str, *args, **kwargs):
+        no_cache = kwargs.pop("no_cache", False)
+        embedding = kwargs.pop("precomputed_embedding", None)
+        if embedding is not None:
+            # Retrieval embeds the same query text, so serve it from the cache too
+            self.bedrock_embedding.seed([query], [embedding])
+        
+        if self.semantic_cache is None or no_cache:
+            return await query_method(self, query, *args, **kwargs)
+        
+        bound = signature.bind(self, query, *args, **kwargs)
+        bound.apply_defaults()
+        namespace = _semantic_cache_namespace(query_method.__name__, bound.arguments)
+        
+        if embedding is None:
+            embedding = await self.bedrock_embedding.embed_single(query)
+        cached = self.semantic_cache.lookup(embedding, namespace)
+        if cached is not None:
+            self.logger.info(f"Semantic cache hit for query: {query[:100]}")
+            return cached
+        
+        result = await query_method(self, query, *args, **kwargs)
+        if isinstance(result, str) and result:
+            self.semantic_cache.store(embedding, result, namespace)
+        return result
+    
+    return wrapper
+
+
 class BedrockRAGAnything(RAGAnything):
     """Extended RAGAnything class with AWS Bedrock integration"""
     
@@ -52,6 +136,7 @@ class BedrockRAGAnything(RAGAnything):
         self.bedrock_llm = BedrockLLMProvider(self.bedrock_config, self.bedrock_auth)
         self.bedrock_vision = BedrockVisionProvider(self.bedrock_config, self.bedrock_auth)
         self.bedrock_embedding = BedrockEmbeddingProvider(self.bedrock_config, self.bedrock_auth)
+        self.bedrock_batch = BedrockBatchEmbedder(self.bedrock_config, self.bedrock_auth)
         
         self.logger.info("Initialized Bedrock providers")
         
@@ -60,15 +145,44 @@ class BedrockRAGAnything(RAGAnything):
         vision_func = self._create_vision_func()
         embedding_func = self._create_embedding_func()
         
+        # Let LightRAG hand chunk texts to the embedding function in groups
+        # matching the Bedrock embedding batch size, so each insert issues
+        # concurrent Titan requests instead of one request per chunk
+        lightrag_kwargs = dict(kwargs.pop("lightrag_kwargs", None) or {})
+        lightrag_kwargs.setdefault("embedding_batch_num", self.bedrock_config.embedding_batch_size)
+        lightrag_kwargs.setdefault("embedding_func_max_async", self.bedrock_config.max_concurrent_requests)
+        
         # Initialize parent class with Bedrock functions
         super().__init__(
             config=config,
             llm_model_func=llm_func,
             vision_model_func=vision_func,
             embedding_func=embedding_func,
+            lightrag_kwargs=lightrag_kwargs,
             **kwargs
         )
         
+        # Embeddings cached on disk by content hash, so re-inserting the same
+        # text skips the Titan round-trip
+        if self.bedrock_config.embedding_cache_enabled:
+            self.bedrock_embedding.embedding_cache = DiskEmbeddingCache(
+                os.path.join(self.working_dir, "emb_cache")
+            )
+        
+        # Semantic cache for query responses, persisted alongside RAG storage
+        self.semantic_cache = None
+        if self.bedrock_config.semantic_cache_enabled:
+            self.semantic_cache = SemanticCache(
+                dimension=self.bedrock_embedding.get_embedding_dimension(),
+                similarity_threshold=self.bedrock_config.semantic_cache_threshold,
+                ttl=self.bedrock_config.semantic_cache_ttl,
+                max_entries=self.bedrock_config.semantic_cache_max_entries,
+                persist_path=os.path.join(self.working_dir, "semcache.npz"),
+            )
+        
+        # Conversational queries are answered without retrieval
+        self.query_validator = QueryValidator() if self.bedrock_config.query_validation_enabled else None
+        
         self.logger.info("BedrockRAGAnything initialized successfully")
     
     def _create_llm_func(self) -> Callable:
@@ -149,10 +263,10 @@ class BedrockRAGAnything(RAGAnything):
     def _create_embedding_func(self) -> EmbeddingFunc:
         """Create embedding function compatible with LightRAG interface"""
         
-        async def embedding_func(texts: List[str]) -> List[List[float]]:
+        async def embedding_func(texts: List[str]) -> np.ndarray:
             """Embedding function wrapper for Bedrock"""
             try:
-                return await self.bedrock_embedding.embed_texts(texts)
+                return await self.aembed_batch(texts)
             except Exception as e:
                 self.logger.error(f"Embedding function error: {str(e)}")
                 raise
@@ -163,6 +277,382 @@ class BedrockRAGAnything(RAGAnything):
             func=embedding_func
         )
     
+    async def aembed_batch(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed a list of texts with Titan in a single concurrent wave
+        
+        Titan accepts one input per InvokeModel call, so the texts are sent
+        as concurrent requests bounded by ``max_concurrent_requests`` rather
+        than in sequential sub-batches.
+        
+        Args:
+            texts: Texts to embed
+        
+        Returns:
+            np.ndarray: float32 array with one embedding row per text, in input order
+        """
+        return await self.bedrock_embedding.embed_texts(texts, batch_size=max(len(texts), 1))
+    
+    async def aquery(self, query: str, mode: str = "mix", **kwargs) -> str:
+        """
+        Pure text query, served from the semantic cache when enabled
+        
+        Conversational queries (greetings, thanks) are answered directly by
+        Claude Haiku without retrieval when query validation is enabled.
+        
+        Args:
+            query: Query text
+            mode: Query mode ("local", "global", "hybrid", "naive", "mix", "bypass")
+            **kwargs: Other query parameters passed to RAGAnything.aquery
+                - no_cache: bool, skip the semantic cache for this call
+                - precomputed_embedding: List[float], Titan embedding of the query
+        
+        Returns:
+            str: Query result
+        """
+        if self.query_validator is not None and not self.query_validator.needs_rag(query):
+            self.logger.info(f"Answering conversational query without retrieval: {query[:100]}")
+            return await self.bedrock_llm.complete_fast(
+                prompt=query,
+                system_prompt=DIRECT_SYSTEM_PROMPT
+            )
+        
+        return await self._aquery_rag(query, mode=mode, **kwargs)
+    
+    @semantic_cached
+    async def _aquery_rag(self, query: str, mode: str = "mix", **kwargs) -> str:
+        """Retrieval-backed query behind the semantic cache"""
+        return await super().aquery(query, mode=mode, **kwargs)
+    
+    async def aquery_with_multimodal(
+        self,
+        query: str,
+        multimodal_content: List[Dict[str, Any]] = None,
+        mode: str = "mix",
+        **kwargs
+    ) -> str:
+        """
+        Multimodal query, served from the semantic cache when enabled
+        
+        Cache entries are namespaced by mode and a hash of the multimodal
+        content, so a similar question about a different image or table is
+        never answered from the cache.
+        
+        Args:
+            query: Base query text
+            multimodal_content: List of multimodal content items
+            mode: Query mode ("local", "global", "hybrid", "naive", "mix", "bypass")
+            **kwargs: Other query parameters passed to RAGAnything.aquery_with_multimodal
+                - no_cache: bool, skip the semantic cache for this call
+                - precomputed_embedding: List[float], Titan embedding of the query
+        
+        Returns:
+            str: Query result
+        """
+        if not multimodal_content:
+            return await self.aquery(query, mode=mode, **kwargs)
+        
+        return await self._aquery_multimodal_rag(
+            query, multimodal_content=multimodal_content, mode=mode, **kwargs
+        )
+    
+    @semantic_cached
+    async def _aquery_multimodal_rag(
+        self,
+        query: str,
+        multimodal_content: List[Dict[str, Any]] = None,
+        mode: str = "mix",
+        **kwargs
+    ) -> str:
+        """Multimodal query behind the semantic cache"""
+        return await super().aquery_with_multimodal(
+            query, multimodal_content=multimodal_content, mode=mode, **kwargs
+        )
+    
+    @semantic_cached
+    async def aquery_adaptive(self, query: str, mode: str = "mix", **kwargs) -> str:
+        """
+        Query with Claude Haiku first and escalate to the main Claude model
+        only when Haiku grades its own draft as insufficient
+        
+        Retrieval runs once; the same context is reused for both models.
+        
+        Args:
+            query: Query text
+            mode: Query mode ("local", "global", "hybrid", "naive", "mix")
+            **kwargs: Other query parameters, will be passed to QueryParam
+                - no_cache: bool, skip the semantic cache for this call
+                - precomputed_embedding: List[float], Titan embedding of the query
+        
+        Returns:
+            str: Query result
+        """
+        if self.lightrag is None:
+            raise ValueError(
+                "No LightRAG instance available. Please process documents first or provide a pre-initialized LightRAG instance."
+            )
+        
+        query_param = QueryParam(mode=mode, only_need_context=True, **kwargs)
+        context = await self.lightrag.aquery(query, param=query_param)
+        prompt = f"Context:\n{context}\n\nQuestion: {query}"
+        
+        draft = await self.bedrock_llm.complete(
+            prompt=prompt,
+            system_prompt=ADAPTIVE_DRAFT_SYSTEM_PROMPT,
+            model_id=self.bedrock_config.claude_haiku_model_id
+        )
+        
+        answer, _, grade = draft.rpartition("GRADE:")
+        if answer and grade.strip().lower().startswith("yes"):
+            self.logger.info("Adaptive query answered by Haiku draft")
+            return answer.strip()
+        
+        self.logger.info("Adaptive query escalated to main Claude model")
+        return await self.bedrock_llm.complete(
+            prompt=prompt,
+            system_prompt=ADAPTIVE_SYNTHESIS_SYSTEM_PROMPT,
+            model_id=self.bedrock_config.claude_model_id
+        )
+    
+    async def aquery_stream(
+        self,
+        query: str,
+        mode: str = "mix",
+        max_chars: Optional[int] = None,
+        **kwargs
+    ) -> AsyncIterator[str]:
+        """
+        Pure text query that yields the Claude response as it is generated
+        
+        Retrieval runs through LightRAG to build the full prompt, which is
+        then sent with InvokeModelWithResponseStream. Callers can stop
+        consuming early, e.g. once they have enough text to display.
+        
+        With the semantic cache enabled, a query similar to one answered
+        earlier by ``aquery`` or ``aquery_stream`` in the same mode and with
+        the same parameters yields the cached answer as a single chunk.
+        Streams read to the end are stored in the cache.
+        
+        Args:
+            query: Query text
+            mode: Query mode ("local", "global", "hybrid", "naive", "mix")
+            max_chars: Stop generation once at least this many characters
+                have been yielded (optional)
+            **kwargs: Other query parameters, will be passed to QueryParam
+                - no_cache: bool, skip the semantic cache for this call
+                - precomputed_embedding: List[float], Titan embedding of the query
+        
+        Yields:
+            str: Response text chunks
+        """
+        await self._ensure_lightrag_initialized()
+        
+        no_cache = kwargs.pop("no_cache", False)
+        embedding = kwargs.pop("precomputed_embedding", None)
+        if embedding is not None:
+            self.bedrock_embedding.seed([query], [embedding])
+        
+        use_cache = self.semantic_cache is not None and not no_cache
+        if use_cache:
+            # Same namespace as aquery, which answers from the same retrieval
+            namespace = _semantic_cache_namespace("_aquery_rag", {"mode": mode, "kwargs": kwargs})
+            if embedding is None:
+                embedding = await self.bedrock_embedding.embed_single(query)
+            cached = self.semantic_cache.lookup(embedding, namespace)
+            if cached is not None:
+                self.logger.info(f"Semantic cache hit for query: {query[:100]}")
+                yield cached[:max_chars] if max_chars is not None else cached
+                return
+        
+        query_param = QueryParam(mode=mode, only_need_prompt=True, **kwargs)
+        prompt = await self.lightrag.aquery(query, param=query_param)
+        if not prompt:
+            return
+        
+        self.logger.info(f"Streaming text query: {query[:100]}...")
+        
+        stream = self.bedrock_llm.complete_streaming(prompt=prompt)
+        chunks: List[str] = []
+        emitted = 0
+        completed = False
+        try:
+            async for chunk in stream:
+                yield chunk
+                chunks.append(chunk)
+                emitted += len(chunk)
+                if max_chars is not None and emitted >= max_chars:
+                    break
+            else:
+                completed = True
+        finally:
+            # Closing the stream stops generation, so unread tokens are not billed
+            await stream.aclose()
+        
+        # Only complete answers are cached; a preview cut at max_chars is not
+        if use_cache and completed and chunks:
+            self.semantic_cache.store(embedding, "".join(chunks), namespace)
+    
+    async def prewarm_embeddings_batch(
+        self,
+        file_paths: List[str],
+        output_dir: Optional[str] = None,
+        parse_method: Optional[str] = None,
+        split_by_character: Optional[str] = None,
+        split_by_character_only: bool = False,
+    ) -> int:
+        """
+        Embed the text chunks of documents with Bedrock Batch Inference
+        
+        Documents are parsed and chunked the way ``process_document_complete``
+        will chunk them, and the resulting embeddings seed the embedding
+        caches so the subsequent insert issues no on-demand Titan calls for
+        those chunks. Chunks that do not match (or records the job failed)
+        are embedded on demand as usual.
+        
+        Args:
+            file_paths: Documents that are about to be processed
+            output_dir: Directory for parsed outputs (optional)
+            parse_method: Parsing method to use (optional)
+            split_by_character: Character to split by (optional)
+            split_by_character_only: Whether to split only by character
+        
+        Returns:
+            int: Number of chunk embeddings added to the caches
+        """
+        if not self.bedrock_batch.is_configured():
+            self.logger.info("Batch inference not configured, skipping embedding prewarm")
+            return 0
+        
+        await self._ensure_lightrag_initialized()
+        lightrag = self.lightrag
+        
+        chunk_texts = {}
+        for file_path in file_paths:
+            content_list, _ = await self.parse_document(
+                str(file_path),
+                output_dir=output_dir,
+                parse_method=parse_method,
+                display_stats=False
+            )
+            text_content, _ = separate_content(content_list)
+            if not text_content.strip():
+                continue
+            
+            chunks = lightrag.chunking_func(
+                lightrag.tokenizer,
+                text_content,
+                split_by_character,
+                split_by_character_only,
+                lightrag.chunk_overlap_token_size,
+                lightrag.chunk_token_size,
+            )
+            if inspect.isawaitable(chunks):
+                chunks = await chunks
+            for chunk in chunks:
+                chunk_texts.setdefault(chunk["content"], None)
+        
+        # Chunks embedded on an earlier run are already in the caches
+        texts = self.bedrock_embedding.find_uncached_texts(list(chunk_texts))
+        if len(texts) < BedrockBatchEmbedder.MIN_RECORDS:
+            self.logger.info(
+                f"Only {len(texts)} uncached chunks, below the batch inference minimum; using on-demand embedding"
+            )
+            return 0
+        
+        embeddings = await self.bedrock_batch.embed_texts(texts)
+        seeded = self.bedrock_embedding.seed(texts, embeddings)
+        self.logger.info(f"Seeded {seeded} chunk embeddings from batch inference")
+        return seeded
+    
+    async def process_folder_batch_async(
+        self,
+        folder_path: str,
+        interactive: bool = False,
+        file_extensions: Optional[List[str]] = None,
+        recursive: Optional[bool] = None,
+        **kwargs
+    ):
+        """
+        Process a folder, embedding its chunks with Bedrock Batch Inference first
+        
+        Args:
+            folder_path: Path to the folder containing files to process
+            interactive: Skip batch inference and embed on demand
+            file_extensions: List of file extensions to process (optional)
+            recursive: Whether to process folders recursively (optional)
+            **kwargs: Other arguments passed to ``process_folder_complete``
+        """
+        if file_extensions is None:
+            file_extensions = self.config.supported_file_extensions
+        if recursive is None:
+            recursive = self.config.recursive_folder_processing
+        
+        if not interactive:
+            folder = Path(folder_path)
+            file_paths = []
+            for file_ext in file_extensions:
+                pattern = f"**/*{file_ext}" if recursive else f"*{file_ext}"
+                file_paths.extend(folder.glob(pattern))
+            
+            await self.prewarm_embeddings_batch(
+                file_paths,
+                output_dir=kwargs.get("output_dir"),
+                parse_method=kwargs.get("parse_method"),
+                split_by_character=kwargs.get("split_by_character"),
+                split_by_character_only=kwargs.get("split_by_character_only", False),
+            )
+        
+        await self.process_folder_complete(
+            folder_path,
+            file_extensions=file_extensions,
+            recursive=recursive,
+            **kwargs
+        )
+    
+    def _invalidate_semantic_cache(self) -> None:
+        """Drop cached answers once the knowledge base has changed"""
+        if self.semantic_cache is not None and len(self.semantic_cache):
+            self.semantic_cache.clear()
+            self.logger.info("Cleared semantic cache after inserting documents")
+    
+    async def insert_content_list(self, *args, **kwargs):
+        """Insert a content list and clear the semantic cache"""
+        try:
+            return await super().insert_content_list(*args, **kwargs)
+        finally:
+            self._invalidate_semantic_cache()
+    
+    async def process_document_complete(self, *args, **kwargs):
+        """Process a document and clear the semantic cache"""
+        try:
+            return await super().process_document_complete(*args, **kwargs)
+        finally:
+            self._invalidate_semantic_cache()
+    
+    async def process_document_complete_lightrag_api(self, *args, **kwargs):
+        """Process a document through the LightRAG API path and clear the semantic cache"""
+        try:
+            return await super().process_document_complete_lightrag_api(*args, **kwargs)
+        finally:
+            self._invalidate_semantic_cache()
+    
+    async def finalize_storages(self):
+        """Finalize storages, save the caches and stop background cache cleanup"""
+        if self.semantic_cache is not None:
+            try:
+                await asyncio.to_thread(self.semantic_cache.save)
+            except Exception as e:
+                self.logger.warning(f"Failed to save semantic cache: {e}")
+        
+        if self.bedrock_embedding.embedding_cache is not None:
+            try:
+                await asyncio.to_thread(self.bedrock_embedding.embedding_cache.compact)
+            except Exception as e:
+                self.logger.warning(f"Failed to compact embedding cache: {e}")
+        
+        self.bedrock_llm.close()
+        await super().finalize_storages()
+    
     async def validate_bedrock_access(self) -> bool:
         """Validate that Bedrock models are accessible"""
         try:
@@ -173,18 +663,19 @@ class BedrockRAGAnything(RAGAnything):
                 self.logger.error("Bedrock authentication failed")
                 return False
             
-            # Test LLM access
-            test_result = await self.bedrock_llm.complete(
-                prompt="Hello, this is a test.",
-                max_tokens=10
+            # Test LLM and embedding access concurrently
+            test_result, test_embedding = await asyncio.gather(
+                self.bedrock_llm.complete(
+                    prompt="Hello, this is a test.",
+                    max_tokens=10
+                ),
+                self.bedrock_embedding.embed_single("test")
             )
             if not test_result:
                 self.logger.error("LLM test failed")
                 return False
             
-            # Test embedding access
-            test_embedding = await self.bedrock_embedding.embed_single("test")
-            if not test_embedding:
+            if not test_embedding.any():
                 self.logger.error("Embedding test failed")
                 return False
             
@@ -207,6 +698,9 @@ class BedrockRAGAnything(RAGAnything):
                 "temperature": self.bedrock_config.temperature,
             },
             "embedding_dimension": self.bedrock_embedding.get_embedding_dimension(),
+            "semantic_cache_entries": len(self.semantic_cache) if self.semantic_cache is not None else None,
+            "embedding_cache": (self.bedrock_embedding.embedding_cache.get_stats()
+                                if self.bedrock_embedding.embedding_cache is not None else None),
             "providers": {
                 "llm": self.bedrock_llm.__class__.__name__,
                 "vision": self.bedrock_vision.__class__.__name__,
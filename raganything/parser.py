@@ -1017,8 +1017,8 @@ class MineruParser(Parser):
                         actual_image_path = temp_converted_file
 
                 except Exception as e:
-                    if temp_converted_file and temp_converted_file.exists():
-                        temp_converted_file.unlink()
+                    if temp_converted_file:
+                        temp_converted_file.unlink(missing_ok=True)
                     raise RuntimeError(
                         f"Failed to convert image {image_path.name}: {str(e)}"
                     )
@@ -4,6 +4,7 @@ Query functionality for RAGAnything
 Contains all query-related methods for both text and multimodal queries
 """
 
+import base64
 import json
 import hashlib
 import re
@@ -57,6 +58,11 @@ class QueryMixin:
                             "file_path",
                         ] and isinstance(value, str):
                             normalized_item[key] = Path(value).name
+                        # Inline image bytes are hashed rather than stored
+                        elif key == "img_bytes" and isinstance(value, bytes):
+                            normalized_item["img_bytes_hash"] = hashlib.md5(
+                                value
+                            ).hexdigest()
                         # For large content, create a hash instead of storing directly
                         elif (
                             key in ["table_data", "table_body"]
@@ -167,7 +173,7 @@ class QueryMixin:
             query: Base query text
             multimodal_content: List of multimodal content, each element contains:
                 - type: Content type ("image", "table", "equation", etc.)
-                - Other fields depend on type (e.g., img_path, table_data, latex, etc.)
+                - Other fields depend on type (e.g., img_path or img_bytes, table_data, latex, etc.)
             mode: Query mode ("local", "global", "hybrid", "naive", "mix", "bypass")
             **kwargs: Other query parameters, will be passed to QueryParam
 
@@ -437,12 +443,16 @@ class QueryMixin:
     ) -> str:
         """Generate image description for query"""
         image_path = content.get("img_path")
+        image_bytes = content.get("img_bytes")
         captions = content.get("image_caption", content.get("img_caption", []))
         footnotes = content.get("image_footnote", content.get("img_footnote", []))
 
-        if image_path and Path(image_path).exists():
+        if image_bytes or (image_path and Path(image_path).exists()):
             # If image exists, use vision model to generate description
-            image_base64 = processor._encode_image_to_base64(image_path)
+            if image_bytes:
+                image_base64 = base64.b64encode(image_bytes).decode("utf-8")
+            else:
+                image_base64 = processor._encode_image_to_base64(image_path)
             if image_base64:
                 prompt = PROMPTS["QUERY_IMAGE_DESCRIPTION"]
                 description = await processor.modal_caption_func(
@@ -733,7 +743,7 @@ class QueryMixin:
             query: Base query text
             multimodal_content: List of multimodal content, each element contains:
                 - type: Content type ("image", "table", "equation", etc.)
-                - Other fields depend on type (e.g., img_path, table_data, latex, etc.)
+                - Other fields depend on type (e.g., img_path or img_bytes, table_data, latex, etc.)
             mode: Query mode ("local", "global", "hybrid", "naive", "mix", "bypass")
             **kwargs: Other query parameters, will be passed to QueryParam
 